@@ -1,19 +1,55 @@
 from flask import Flask
-from flask_graphql import GraphQLView
+from sqlalchemy.orm import configure_mappers
+from view import GraphQLView
+from backend import CachedBackend
+from persisted_queries import PersistedQueryStore
+from response_cache import ResponseCache
 from schema import schema 
-from database import init_db
+from database import bootstrap_db, engine, on_commit
+from config import DB_BOOTSTRAP, FAST_LIST_COMPLETION, PARALLEL_RESOLVERS, RESPONSE_CACHE
+from executors import PoolExecutor
+import fast_lists
+import sessions
 
 app = Flask(__name__)
+# Sessão do banco removida no fim de cada requisição (ver sessions.py)
+sessions.init_app(app)
 
-@app.before_first_request
-def setup():
-    init_db()
+if FAST_LIST_COMPLETION:
+    fast_lists.install()
+
+# Cache de queries já analisadas e validadas, compartilhado entre requisições
+document_cache = CachedBackend()
+persisted_queries = PersistedQueryStore()
+
+# Respostas de queries, invalidadas pelos commits que alteram as tabelas
+response_cache = ResponseCache() if RESPONSE_CACHE else None
+if response_cache is not None:
+    on_commit(response_cache.invalidate)
+
+def warm_up():
+    # Adianta o trabalho que a primeira requisição faria: configuração dos
+    # mappers, conexão com o banco e análise/validação das queries
+    # persistidas, que já entram no cache de documentos
+    configure_mappers()
+    engine.connect().close()
+    document_cache.document_from_string(schema, '{ __typename }').execute()
+    for query in persisted_queries.preload():
+        document_cache.document_from_string(schema, query)
+
+# Uma vez por processo, antes de qualquer requisição
+if DB_BOOTSTRAP:
+    bootstrap_db()
 
 app.add_url_rule(
     '/graphql',
     view_func=GraphQLView.as_view(
         'graphql',
         schema=schema,
+        backend=document_cache,
+        persisted_queries=persisted_queries,
+        response_cache=response_cache,
+        executor=PoolExecutor() if PARALLEL_RESOLVERS else None,
         graphiql=True
     )
 )
@@ -0,0 +1,127 @@
+# asgi.py
+# Ponto de entrada ASGI para /graphql (ex.: uvicorn asgi:app). A execução
+# usa o AsyncioExecutor do graphql-core com os campos raiz (das mutations,
+# um de cada vez) e os lotes dos loaders resolvidos no pool de threads do
+# banco (executors.py), então campos raiz independentes não esperam uns
+# pelos outros e o loop não fica bloqueado no SQLite nem à espera de uma
+# conexão do pool. Cada requisição tem sua própria sessão e seus próprios loaders.
+from urllib.parse import parse_qsl
+
+from graphql_server import (
+    HttpQueryError,
+    default_format_error,
+    encode_execution_results,
+    load_json_body,
+    run_http_query,
+)
+from promise import Promise
+
+from app import document_cache, warm_up
+from config import (
+    GRAPHQL_BATCH,
+    JSON_ENCODER,
+    JSON_STREAM_CHUNK,
+    JSON_STREAM_THRESHOLD,
+    MAX_BATCH_SIZE,
+)
+from database import request_session
+from encoding import ResponseEncoder
+from executors import OffloadingAsyncioExecutor, db_pool
+from loaders import Loaders
+from schema import schema
+
+encode = ResponseEncoder(JSON_ENCODER, JSON_STREAM_THRESHOLD, JSON_STREAM_CHUNK)
+
+async def read_body(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+async def respond(send, status, content, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + [
+            (name.encode('latin-1'), value.encode('latin-1')) for name, value in headers
+        ],
+    })
+    # Respostas grandes chegam do encoder em pedaços (ver encoding.py)
+    chunks = [content] if isinstance(content, str) else content
+    for chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+def parse_body(content_type, body):
+    if not body:
+        return {}
+    if content_type == 'application/graphql':
+        return {'query': body.decode('utf8')}
+    if content_type == 'application/json':
+        return load_json_body(body.decode('utf8'))
+    if content_type == 'application/x-www-form-urlencoded':
+        return dict(parse_qsl(body.decode('utf8')))
+    return {}
+
+async def execute(scope, body):
+    headers = dict(scope['headers'])
+    content_type = headers.get(b'content-type', b'').split(b';')[0].strip().decode('latin-1')
+    data = parse_body(content_type, body)
+    if isinstance(data, list) and GRAPHQL_BATCH and len(data) > MAX_BATCH_SIZE:
+        raise HttpQueryError(413, 'Batch size exceeds the limit of {} operations.'.format(MAX_BATCH_SIZE))
+
+    # Os loaders mandam as consultas para o pool pelo executor ativo
+    with OffloadingAsyncioExecutor().activate() as executor:
+        execution_results, _ = run_http_query(
+            schema,
+            scope['method'].lower(),
+            data,
+            query_data=dict(parse_qsl(scope['query_string'].decode('latin-1'))),
+            batch_enabled=GRAPHQL_BATCH,
+            backend=document_cache,
+            root=None,
+            context={'request': scope, 'loaders': Loaders()},
+            executor=executor,
+            return_promise=True,
+        )
+        execution_results = await Promise.all(execution_results)
+    return encode_execution_results(
+        execution_results,
+        is_batch=isinstance(data, list),
+        format_error=default_format_error,
+        encode=encode,
+    )
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            warm_up()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            db_pool.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    body = await read_body(receive)
+    if scope['path'] != '/graphql':
+        return await respond(send, 404, encode({'errors': [{'message': 'Not Found'}]}))
+    if scope['method'] not in ('GET', 'POST'):
+        return await respond(send, 405, encode({'errors': [{'message': 'Method Not Allowed'}]}),
+                             [('allow', 'GET, POST')])
+
+    with request_session():
+        try:
+            result, status_code = await execute(scope, body)
+        except HttpQueryError as e:
+            return await respond(send, e.status_code, encode({'errors': [default_format_error(e)]}),
+                                 list((e.headers or {}).items()))
+    await respond(send, status_code, result)
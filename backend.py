@@ -0,0 +1,201 @@
+# backend.py
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+
+from graphql import parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.validation.rules import specified_rules
+from promise import is_thenable
+
+from compiler import compile_document
+from cost import CostAnalysis, execution_cost
+from config import DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_MAX_BYTES, QUERY_COMPILE_THRESHOLD
+from database import read_only_session, task_scope
+from executors import OffloadingAsyncioExecutor
+
+def invalid_result(errors, *args, **kwargs):
+    return ExecutionResult(errors=errors, invalid=True)
+
+# O to_dict do graphql-core omite as extensions da resposta
+class ExtendedExecutionResult(ExecutionResult):
+    __slots__ = ()
+
+    def to_dict(self, format_error=None, dict_class=OrderedDict):
+        response = super(ExtendedExecutionResult, self).to_dict(format_error, dict_class)
+        if self.extensions:
+            response['extensions'] = self.extensions
+        return response
+
+def with_cost(result, cost):
+    return ExtendedExecutionResult(
+        data=result.data, errors=result.errors, invalid=result.invalid,
+        extensions=dict(result.extensions, cost=cost))
+
+def wrap_execute(document, costs):
+    # Operações query executam com a sessão somente leitura (engine de
+    # leitura); mutations seguem no engine de escrita. Com return_promise
+    # (ex.: asgi.py) a execução continua depois do retorno: a operação roda
+    # em uma sessão de tarefa, somente leitura até o fim, que os callbacks
+    # agendados por ela herdam pelo contextvar. O custo calculado na
+    # validação (ou, se depende de variáveis, com os valores recebidos,
+    # rejeitando a operação acima do máximo) vai em extensions.cost. No
+    # asgi.py as operações de um lote respeitam a ordem das mutations, cujos
+    # campos rodam no pool na sessão da requisição (ver executors.py)
+    execute_fn = document.execute
+
+    def execute_wrapped(*args, **kwargs):
+        operation_name = kwargs.get('operation_name')
+        cost_name = operation_name
+        if not cost_name and len(costs) == 1:
+            cost_name = next(iter(costs))
+        cost = costs.get(cost_name)
+        if cost is None and cost_name in costs:
+            variables = kwargs.get('variable_values', kwargs.get('variables'))
+            cost, error = execution_cost(document.schema, document.document_ast, cost_name, variables)
+            if error is not None:
+                return with_cost(ExecutionResult(errors=[error], invalid=True), cost)
+
+        executor = kwargs.get('executor')
+        mutation = document.get_operation_type(operation_name) != 'query'
+        if isinstance(executor, OffloadingAsyncioExecutor) and kwargs.get('return_promise'):
+            if mutation:
+                result = executor.in_order(True, execute_fn, *args, **kwargs)
+            else:
+                result = executor.in_order(False, task_scope().run, execute_fn, *args, **kwargs)
+        elif mutation:
+            result = execute_fn(*args, **kwargs)
+        elif kwargs.get('return_promise'):
+            result = task_scope().run(execute_fn, *args, **kwargs)
+        else:
+            with read_only_session():
+                result = execute_fn(*args, **kwargs)
+        if cost is None:
+            return result
+        # Com return_promise (ex.: asgi.py) o resultado chega depois
+        if is_thenable(result):
+            return result.then(lambda value: with_cost(value, cost))
+        return with_cost(result, cost)
+
+    document.execute = execute_wrapped
+    return document
+
+# Backend com cache LRU de documentos. Ao contrário do GraphQLCachedBackend
+# do graphql-core (dict sem limite, validação repetida a cada execução),
+# a query é analisada e validada uma única vez, e o cache é limitado em
+# número de documentos e no tamanho total do texto das queries (a AST cresce
+# na mesma proporção).
+# Documentos válidos usados compile_threshold vezes são compilados em código
+# Python especializado (ver compiler.py).
+class CachedBackend(GraphQLBackend):
+    def __init__(self, max_size=DOCUMENT_CACHE_SIZE, max_bytes=DOCUMENT_CACHE_MAX_BYTES,
+                 compile_threshold=QUERY_COMPILE_THRESHOLD):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.compile_threshold = compile_threshold
+        self.documents = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compiled = 0
+        self.lock = Lock()
+
+    def build_document(self, schema, request_string):
+        document_ast = parse(request_string)
+        costs = {}
+        validation_errors = validate(
+            schema, document_ast, specified_rules + [partial(CostAnalysis, costs=costs)])
+        if validation_errors:
+            execute_fn = partial(invalid_result, validation_errors)
+            # Sem recalcular na execução o custo das operações inválidas
+            costs = dict((name, cost) for name, cost in costs.items() if cost is not None)
+        else:
+            execute_fn = partial(execute, schema, document_ast)
+        document = GraphQLDocument(
+            schema=schema,
+            document_string=request_string,
+            document_ast=document_ast,
+            execute=execute_fn,
+        )
+        document.hits = 0
+        document.compilable = not validation_errors
+        document.costs = costs
+        return wrap_execute(document, costs)
+
+    def document_from_string(self, schema, request_string):
+        key = (schema, request_string)
+        with self.lock:
+            document = self.documents.get(key)
+            if document is not None:
+                self.documents.move_to_end(key)
+                self.hits += 1
+                document.hits += 1
+                if not (self.compile_threshold and document.compilable
+                        and document.hits == self.compile_threshold):
+                    return document
+            else:
+                self.misses += 1
+
+        if document is not None:
+            return self.compile(key, document)
+
+        document = self.build_document(schema, request_string)
+        self.store(key, document)
+        return document
+
+    def compile(self, key, document):
+        compiled = compile_document(document)
+        with self.lock:
+            document.compilable = False
+            if compiled is None or key not in self.documents:
+                return document
+            compiled.hits = document.hits
+            compiled.compilable = False
+            compiled.costs = document.costs
+            wrap_execute(compiled, document.costs)
+            self.documents[key] = compiled
+            self.compiled += 1
+        return compiled
+
+    def store(self, key, document):
+        size = len(key[1].encode('utf8'))
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.documents:
+                return
+            self.documents[key] = document
+            self.size_bytes += size
+            while len(self.documents) > self.max_size or self.size_bytes > self.max_bytes:
+                old_key, _ = self.documents.popitem(last=False)
+                self.size_bytes -= len(old_key[1].encode('utf8'))
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.documents),
+                'bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'compiled': self.compiled,
+            }
+
+# Backend de uma requisição: repassa a busca ao backend compartilhado uma
+# vez por query, então a mesma query obtida antes da execução (ex.: para a
+# chave do cache de respostas, ver view.py) não conta duas vezes nas
+# estatísticas nem no limiar de compilação
+class RequestBackend(GraphQLBackend):
+    def __init__(self, backend):
+        self.backend = backend
+        self.documents = {}
+
+    def document_from_string(self, schema, request_string):
+        key = (schema, request_string)
+        document = self.documents.get(key)
+        if document is None:
+            document = self.documents[key] = self.backend.document_from_string(schema, request_string)
+        return document
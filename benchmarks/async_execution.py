@@ -0,0 +1,116 @@
+# benchmarks/async_execution.py
+# Latência de uma query com 5 campos raiz independentes, cada um fazendo
+# uma varredura em contracts (amount e fidelity não têm índice): execução
+# síncrona (schema.execute, um campo após o outro) x PoolExecutor (o do app
+# Flask) x entrada ASGI, com os campos raiz resolvidos em paralelo no pool
+# de threads do banco.
+#
+# Depois, CONCURRENT requisições simultâneas na entrada ASGI com campos que
+# passam pelos loaders: o tempo total e o maior atraso do loop (que cresce
+# se algo bloqueia a thread do loop, ex.: à espera de uma conexão do pool).
+# Se o loop trava, o caso estoura TIMEOUT em vez de esperar o pool_timeout.
+#
+#   python -m benchmarks.async_execution
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.common import seed
+from database import db_session
+from executors import PoolExecutor
+from schema import schema
+
+USERS = 1000
+CONTRACTS = 200000
+REPEAT = 20
+CONCURRENT = 30
+TIMEOUT = 10
+
+QUERY = '{ %s }' % ' '.join(
+    'f%d: contracts(first: 10, filter: {min_amount: 999, fidelity: %d}) { id amount }' % (i, 19 + i)
+    for i in range(5)
+)
+
+CONCURRENT_QUERY = '{ a: users(first: 5) { id contracts { id } } b: getContract(id: 3) { user { id name } } }'
+
+def run_sync(executor=None):
+    options = {'executor': executor} if executor else {}
+    result = schema.execute(QUERY, context={}, **options)
+    assert not result.errors, result.errors
+    db_session.remove()
+
+async def run_asgi(app, body):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({
+        'type': 'http', 'method': 'POST', 'path': '/graphql', 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')],
+    }, receive, send)
+    assert sent[0]['status'] == 200, sent
+
+async def run_concurrent(app, body):
+    # Devolve (tempo total, maior atraso do loop), em ms
+    lag = [0.0]
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag[0] = max(lag[0], time.perf_counter() - start - 0.001)
+
+    probe_task = asyncio.ensure_future(probe())
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*[run_asgi(app, body) for _ in range(CONCURRENT)]), TIMEOUT)
+    finally:
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return elapsed * 1000, lag[0] * 1000
+
+def measure(fn):
+    fn()
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+def main():
+    seed(USERS, CONTRACTS)
+    import asgi
+
+    body = json.dumps({'query': QUERY}).encode('utf-8')
+    pool_executor = PoolExecutor()
+    loop = asyncio.new_event_loop()
+    try:
+        for label, fn in (('sync', run_sync),
+                          ('pool', lambda: run_sync(pool_executor)),
+                          ('asgi', lambda: loop.run_until_complete(run_asgi(asgi.app, body)))):
+            median, worst = measure(fn)
+            print('%-5s campos raiz=5  mediana=%7.1f ms  pior=%7.1f ms' % (label, median, worst))
+
+        body = json.dumps({'query': CONCURRENT_QUERY}).encode('utf-8')
+        try:
+            elapsed, lag = loop.run_until_complete(run_concurrent(asgi.app, body))
+        except asyncio.TimeoutError:
+            print('asgi  %d requisições simultâneas: travou (mais de %d s)' % (CONCURRENT, TIMEOUT))
+        else:
+            print('asgi  %d requisições simultâneas  total=%7.1f ms  atraso do loop=%7.1f ms'
+                  % (CONCURRENT, elapsed, lag))
+    finally:
+        loop.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bulk_contracts.py
+# Importação de contratos: createContracts com 10 mil itens em uma chamada
+# x createContract item a item (uma amostra de 1000 chamadas, cada uma com
+# seu commit).
+#
+#   python -m benchmarks.bulk_contracts
+import time
+
+from benchmarks.common import count_queries, seed
+from database import db_session
+from schema import schema
+
+BULK_ROWS = 10000
+SINGLE_ROWS = 1000
+
+SINGLE = '''
+mutation ($input: CreateContractInput!) { createContract(input: $input) { id } }
+'''
+
+BULK = '''
+mutation ($input: [CreateContractInput!]!) { createContracts(input: $input) { ids created errors { index message } } }
+'''
+
+def items(count):
+    return [
+        {
+            'description': 'Imported %d' % i,
+            'user_id': str(i % 50 + 1),
+            'created_at': '2024-03-01T%02d:%02d:00' % (i // 60 % 24, i % 60),
+            'fidelity': 12,
+            'amount': float(i),
+        }
+        for i in range(count)
+    ]
+
+def single(rows):
+    for item in rows:
+        result = schema.execute(SINGLE, variables={'input': item}, context={})
+        assert not result.errors, result.errors
+        db_session.remove()
+
+def bulk(rows):
+    result = schema.execute(BULK, variables={'input': rows}, context={})
+    assert not result.errors, result.errors
+    assert result.data['createContracts']['created'] == len(rows)
+    db_session.remove()
+
+def main():
+    for label, fn, count in (('createContract', single, SINGLE_ROWS), ('createContracts', bulk, BULK_ROWS)):
+        seed(50, 0)
+        rows = items(count)
+        with count_queries() as queries:
+            start = time.perf_counter()
+            fn(rows)
+            elapsed = time.perf_counter() - start
+        print('%-16s linhas=%6d  tempo=%8.1f ms  linhas/s=%9.0f  comandos SQL=%d' % (
+            label, count, elapsed * 1000, count / elapsed, queries['count']))
+
+if __name__ == '__main__':
+    main()
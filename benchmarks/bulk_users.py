@@ -0,0 +1,52 @@
+# benchmarks/bulk_users.py
+# upsertUsers com 5000 usuários (metade já existente) x createUser item a
+# item (amostra de 500 chamadas: consulta pelo email, insert e commit).
+#
+#   python -m benchmarks.bulk_users
+import time
+
+from benchmarks.common import count_queries, seed
+from database import db_session
+from schema import schema
+
+EXISTING = 2500
+BULK_ROWS = 5000
+SINGLE_ROWS = 500
+
+SINGLE = '''
+mutation ($input: CreateUserInput!) { createUser(input: $input) { id } }
+'''
+
+BULK = '''
+mutation ($input: [CreateUserInput!]!) { upsertUsers(input: $input) { created existing users { id created } } }
+'''
+
+def items(count):
+    # Os EXISTING primeiros emails já estão no banco (ver common.seed)
+    return [{'name': 'Upserted %d' % i, 'email': 'user%d@example.com' % i} for i in range(1, count + 1)]
+
+def single(rows):
+    for item in rows:
+        result = schema.execute(SINGLE, variables={'input': item}, context={})
+        assert not result.errors, result.errors
+        db_session.remove()
+
+def bulk(rows):
+    result = schema.execute(BULK, variables={'input': rows}, context={})
+    assert not result.errors, result.errors
+    assert result.data['upsertUsers']['created'] == len(rows) - EXISTING
+    db_session.remove()
+
+def main():
+    for label, fn, rows in (('createUser', single, items(EXISTING + SINGLE_ROWS)[EXISTING:]),
+                            ('upsertUsers', bulk, items(BULK_ROWS))):
+        seed(EXISTING, 0)
+        with count_queries() as queries:
+            start = time.perf_counter()
+            fn(rows)
+            elapsed = time.perf_counter() - start
+        print('%-12s linhas=%5d  tempo=%8.1f ms  linhas/s=%8.0f  comandos SQL=%d' % (
+            label, len(rows), elapsed * 1000, len(rows) / elapsed, queries['count']))
+
+if __name__ == '__main__':
+    main()
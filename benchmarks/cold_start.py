@@ -0,0 +1,41 @@
+# benchmarks/cold_start.py
+# Cold start do handler do Lambda medido localmente: cada amostra roda em
+# um processo Python novo, que importa wsgi (fase de init do Lambda) e
+# atende duas requisições (a primeira e uma já aquecida).
+#
+#   python -m benchmarks.cold_start
+import json
+import subprocess
+import sys
+
+SAMPLES = 5
+
+CHILD = r'''
+import json, time
+start = time.perf_counter()
+import wsgi
+imported = time.perf_counter()
+client = wsgi.app.test_client()
+body = json.dumps({'query': '{ getContractsByUser(user_id: 1, limit: 5) { Contracts { id amount } nextToken } }'})
+timings = []
+for _ in range(2):
+    t = time.perf_counter()
+    response = client.post('/graphql', data=body, content_type='application/json')
+    assert response.status_code == 200, response.data
+    timings.append(time.perf_counter() - t)
+print(json.dumps([imported - start] + timings))
+'''
+
+def main():
+    from benchmarks.common import seed
+    seed(10, 1000)
+    samples = []
+    for _ in range(SAMPLES):
+        output = subprocess.check_output([sys.executable, '-c', CHILD])
+        samples.append(json.loads(output.decode('utf8').strip().splitlines()[-1]))
+    for index, label in enumerate(('import wsgi', '1ª requisição', '2ª requisição')):
+        values = sorted(sample[index] * 1000 for sample in samples)
+        print('%-14s mediana=%7.2f ms  mín=%7.2f ms' % (label, values[len(values) // 2], values[0]))
+
+if __name__ == '__main__':
+    main()
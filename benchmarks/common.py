@@ -0,0 +1,75 @@
+# benchmarks/common.py
+# Utilitários compartilhados pelos benchmarks. Cada execução usa um banco
+# SQLite temporário para não alterar o database.db do projeto.
+import contextlib
+import datetime
+import os
+import tempfile
+import time
+
+if 'DATABASE_URL' not in os.environ:
+    _fd, DB_PATH = tempfile.mkstemp(prefix='bench-', suffix='.db')
+    os.close(_fd)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + DB_PATH
+
+from sqlalchemy import event
+
+from database import Base, engine, db_session, read_engine
+import models
+
+def reset_db():
+    db_session.remove()
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+def seed(users, contracts):
+    # Insere usuários e contratos em lote; os contratos são distribuídos
+    # igualmente entre os usuários
+    reset_db()
+    start = datetime.datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {'id': i, 'name': 'User %d' % i, 'email': 'user%d@example.com' % i}
+            for i in range(1, users + 1)
+        ])
+        if not contracts:
+            return
+        conn.execute(models.Contract.__table__.insert(), [
+            {
+                'id': i,
+                'description': 'Contract %d' % i,
+                'user_id': (i % users) + 1,
+                'created_at': start + datetime.timedelta(minutes=i),
+                'fidelity': i % 24,
+                'amount': float(i % 1000),
+            }
+            for i in range(1, contracts + 1)
+        ])
+
+@contextlib.contextmanager
+def count_queries():
+    # Conta os comandos SQL emitidos dentro do bloco, nos engines de escrita
+    # e de leitura
+    counter = {'count': 0}
+    engines = set([engine, read_engine])
+
+    def before_cursor_execute(*args):
+        counter['count'] += 1
+
+    for bound in engines:
+        event.listen(bound, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        for bound in engines:
+            event.remove(bound, 'before_cursor_execute', before_cursor_execute)
+
+def timeit(fn, repeat=5):
+    # Retorna o melhor tempo (ms) entre as repetições
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,49 @@
+# benchmarks/contracts_pagination.py
+# Latência de getContractsByUser na página 1 e na página 500 (100 por
+# página) de um usuário com 50 mil contratos.
+#
+#   python -m benchmarks.contracts_pagination
+from benchmarks.common import seed, count_queries, timeit
+from database import db_session
+from models import Contract as ContractModel
+from pagination import encode_cursor
+from schema import schema
+
+PAGE_SIZE = 100
+QUERY = '''
+query ($token: String) {
+  getContractsByUser(user_id: 1, limit: %d, nextToken: $token) {
+    Contracts { id created_at amount }
+    nextToken
+  }
+}
+''' % PAGE_SIZE
+
+def cursor_before_page(page):
+    # Cursor equivalente ao nextToken recebido ao fim da página anterior
+    if page == 1:
+        return None
+    last = (
+        ContractModel.query.filter_by(user_id=1)
+        .order_by(ContractModel.created_at, ContractModel.id)
+        .offset((page - 1) * PAGE_SIZE - 1).first()
+    )
+    return encode_cursor([last.created_at, last.id])
+
+def run(token):
+    db_session.remove()
+    result = schema.execute(QUERY, variables={'token': token}, context={})
+    assert not result.errors, result.errors
+    assert len(result.data['getContractsByUser']['Contracts']) == PAGE_SIZE
+
+def main():
+    # 2 usuários; o usuário 1 fica com 50 mil contratos
+    seed(2, 100000)
+    for page in (1, 500):
+        token = cursor_before_page(page)
+        with count_queries() as counter:
+            run(token)
+        print('pagina %3d  consultas=%d  tempo=%6.1f ms' % (page, counter['count'], timeit(lambda: run(token))))
+
+if __name__ == '__main__':
+    main()
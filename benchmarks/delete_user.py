@@ -0,0 +1,42 @@
+# benchmarks/delete_user.py
+# Exclusão de um usuário com 100 mil contratos: o método anterior (carrega
+# cada contrato no ORM e emite um DELETE por linha) x deleteUser com
+# DELETEs em conjunto.
+#
+#   python -m benchmarks.delete_user
+import time
+
+from benchmarks.common import count_queries, seed
+from database import db_session
+from models import Contract as ContractModel, User as UserModel
+from schema import schema
+
+CONTRACTS_PER_USER = 100000
+
+def orm_delete(user_id):
+    user = UserModel.query.get(user_id)
+    for contract in ContractModel.query.filter_by(user_id=user_id).all():
+        db_session.delete(contract)
+    db_session.delete(user)
+    db_session.commit()
+    db_session.remove()
+
+def set_delete(user_id):
+    result = schema.execute('mutation ($id: ID!) { deleteUser(id: $id) { success } }',
+                            variables={'id': user_id}, context={})
+    assert not result.errors and result.data['deleteUser']['success'], result.errors
+    db_session.remove()
+
+def main():
+    # Com 2 usuários, cada um fica com metade dos contratos
+    seed(2, 2 * CONTRACTS_PER_USER)
+    for label, fn, user_id in (('ORM por linha', orm_delete, 1), ('deleteUser', set_delete, 2)):
+        with count_queries() as queries:
+            start = time.perf_counter()
+            fn(user_id)
+            elapsed = time.perf_counter() - start
+        print('%-14s contratos=%d  tempo=%9.1f ms  comandos SQL=%d' % (
+            label, CONTRACTS_PER_USER, elapsed * 1000, queries['count']))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+# benchmarks/document_cache.py
+# Tempo de uma query repetida com o backend padrão do graphql-core (análise
+# e validação a cada requisição) e com o CachedBackend.
+#
+#   python -m benchmarks.document_cache
+from benchmarks.common import seed, timeit
+from backend import CachedBackend
+from database import db_session
+from schema import schema
+
+QUERY = '''
+query ($user: ID!, $token: String) {
+  getContractsByUser(user_id: $user, limit: 5, nextToken: $token) {
+    Contracts { id description user_id created_at fidelity amount }
+    nextToken
+  }
+  getUser(id: $user) { id name email }
+}
+'''
+
+def run(backend):
+    db_session.remove()
+    result = schema.execute(QUERY, variables={'user': 1}, context={}, backend=backend)
+    assert not result.errors, result.errors
+
+def main():
+    seed(10, 100)
+    cached = CachedBackend()
+    for label, backend in (('padrão', None), ('cache', cached)):
+        print('%-7s tempo=%6.2f ms' % (label, timeit(lambda: run(backend), repeat=200)))
+    print(cached.stats())
+
+if __name__ == '__main__':
+    main()
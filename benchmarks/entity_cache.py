@@ -0,0 +1,51 @@
+# benchmarks/entity_cache.py
+# Consultas repetidas a poucas chaves "quentes": getUser(id) e
+# getContract(id) { user } sobre 20 usuários e 20 contratos, 2000 execuções,
+# com o cache de entidades desligado e ligado (taxa de acerto e SQL).
+#
+#   python -m benchmarks.entity_cache
+import random
+import time
+
+from benchmarks.common import count_queries, seed
+from database import db_session
+from entity_cache import entity_cache
+from schema import schema
+
+HOT_KEYS = 20
+EXECUTIONS = 2000
+
+QUERY = '''
+query ($user: ID!, $contract: ID!) {
+  getUser(id: $user) { id name email }
+  getContract(id: $contract) { contract_id description amount user { id name } }
+}
+'''
+
+def run(keys):
+    for user_id, contract_id in keys:
+        result = schema.execute(QUERY, variables={'user': user_id, 'contract': contract_id}, context={})
+        assert not result.errors, result.errors
+        db_session.remove()
+
+def main():
+    seed(1000, 50000)
+    rng = random.Random(7)
+    keys = [(rng.randint(1, HOT_KEYS), rng.randint(1, HOT_KEYS)) for _ in range(EXECUTIONS)]
+    for label, enabled in (('desligado', False), ('ligado', True)):
+        entity_cache.enabled = enabled
+        entity_cache.clear()
+        before = entity_cache.stats()
+        with count_queries() as queries:
+            start = time.perf_counter()
+            run(keys)
+            elapsed = time.perf_counter() - start
+        stats = entity_cache.stats()
+        hits = stats['hits'] - before['hits']
+        lookups = hits + stats['misses'] - before['misses']
+        print('%-9s execuções=%d  tempo=%7.1f ms  por execução=%6.3f ms  SQL=%5d  acerto=%5.1f%%' % (
+            label, EXECUTIONS, elapsed * 1000, elapsed * 1000 / EXECUTIONS, queries['count'],
+            100.0 * hits / lookups if lookups else 0.0))
+
+if __name__ == '__main__':
+    main()
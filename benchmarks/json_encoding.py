@@ -0,0 +1,52 @@
+# benchmarks/json_encoding.py
+# Codificação de uma resposta com 50 mil contratos: json_encode do
+# graphql-server, ResponseEncoder em uma string e em pedaços (streaming).
+# Mostra o tempo e o pico de memória alocada durante a codificação.
+#
+#   python -m benchmarks.json_encoding
+import json
+import os
+import tracemalloc
+
+os.environ.setdefault('MAX_PAGE_SIZE', '50000')
+
+from graphql_server import json_encode
+
+from benchmarks.common import seed, timeit
+from encoding import ResponseEncoder
+from schema import schema
+
+QUERY = '{ contracts(first: 50000) { id description user_id created_at fidelity amount } }'
+
+def consume(output):
+    # Simula o servidor WSGI enviando cada pedaço
+    if isinstance(output, str):
+        return len(output)
+    return sum(len(chunk) for chunk in output)
+
+def peak_memory(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024.0 / 1024.0
+
+def main():
+    seed(50, 50000)
+    result = schema.execute(QUERY, context={})
+    assert not result.errors, result.errors
+    data = result.to_dict()
+
+    encoders = (
+        ('graphql-server', json_encode),
+        ('string', ResponseEncoder(stream_threshold=None)),
+        ('streaming', ResponseEncoder(stream_threshold=5000, chunk_size=1000)),
+    )
+    expected = json.loads(json_encode(data))
+    for label, encode in encoders:
+        assert json.loads(''.join(encode(data))) == expected
+        fn = lambda: consume(encode(data))
+        print('%-15s tempo=%7.2f ms  pico=%6.2f MB' % (label, timeit(fn, repeat=10), peak_memory(fn)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/list_completion.py
+# Microbenchmark da etapa de completar listas no executor padrão, sem
+# banco: uma lista de 1k/10k/100k contratos em memória com e sem o caminho
+# rápido de fast_lists.
+#
+#   python -m benchmarks.list_completion
+import datetime
+
+import graphene
+
+from benchmarks.common import timeit
+from models import Contract as ContractModel
+from schema import Contract
+import fast_lists
+
+class BenchQuery(graphene.ObjectType):
+    contracts = graphene.List(Contract)
+
+    def resolve_contracts(root, info):
+        return root
+
+bench_schema = graphene.Schema(query=BenchQuery, auto_camelcase=False)
+
+QUERY = '{ contracts { id description user_id created_at fidelity amount } }'
+
+def make_contracts(count):
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        ContractModel(id=i, description='Contract %d' % i, user_id=i % 50 + 1,
+                      created_at=start + datetime.timedelta(minutes=i), fidelity=i % 24, amount=float(i))
+        for i in range(1, count + 1)
+    ]
+
+def run(contracts):
+    result = bench_schema.execute(QUERY, root=contracts)
+    assert not result.errors, result.errors
+    return result.data
+
+def main():
+    for count in (1000, 10000, 100000):
+        contracts = make_contracts(count)
+        repeat = 3 if count == 100000 else 5
+        fast_lists.uninstall()
+        expected = run(contracts)
+        default = timeit(lambda: run(contracts), repeat)
+        fast_lists.install()
+        assert run(contracts) == expected
+        fast = timeit(lambda: run(contracts), repeat)
+        print('%6d contratos  padrão=%8.1f ms  rápido=%7.1f ms  (%.1fx)' % (count, default, fast, default / fast))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/query_batching.py
+# 20 queries de um painel enviadas em um único lote (uma requisição HTTP)
+# e em 20 requisições separadas: tempo total e comandos SQL emitidos.
+#
+#   python -m benchmarks.query_batching
+import json
+
+from benchmarks.common import count_queries, seed, timeit
+from app import app
+from database import db_session
+
+QUERY = '''
+query ($id: ID!) {
+  getContract(id: $id) { contract_id description amount user { id name } }
+}
+'''
+
+OPERATIONS = [{'query': QUERY, 'variables': {'id': i}} for i in range(1, 21)]
+
+def post(client, body):
+    response = client.post('/graphql', data=json.dumps(body), content_type='application/json')
+    assert response.status_code == 200, response.data
+    return json.loads(response.data)
+
+def separate(client):
+    for operation in OPERATIONS:
+        db_session.remove()
+        assert 'errors' not in post(client, operation)
+
+def batched(client):
+    db_session.remove()
+    results = post(client, OPERATIONS)
+    assert len(results) == len(OPERATIONS)
+    assert not any('errors' in result for result in results)
+
+def main():
+    seed(5, 1000)
+    client = app.test_client()
+    for label, fn in (('separadas', separate), ('lote', batched)):
+        with count_queries() as queries:
+            fn(client)
+        print('%-9s tempo=%7.2f ms  queries=%d' % (label, timeit(lambda: fn(client), repeat=20), queries['count']))
+
+if __name__ == '__main__':
+    main()
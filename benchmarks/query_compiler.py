@@ -0,0 +1,32 @@
+# benchmarks/query_compiler.py
+# Executor padrão x documento compilado em `contracts { ... }` com 10 mil
+# contratos (o tempo inclui a consulta ao banco nos dois casos).
+#
+#   python -m benchmarks.query_compiler
+import os
+
+os.environ.setdefault('MAX_PAGE_SIZE', '10000')
+
+from benchmarks.common import seed, timeit
+from backend import CachedBackend
+from compiler import compile_document
+from database import db_session
+from schema import schema
+
+QUERY = '{ contracts(first: 10000) { id description user_id created_at fidelity amount } }'
+
+def run(document):
+    db_session.remove()
+    result = document.execute(context_value={})
+    assert not result.errors, result.errors
+    assert len(result.data['contracts']) == 10000
+
+def main():
+    seed(50, 10000)
+    document = CachedBackend(compile_threshold=0).document_from_string(schema, QUERY)
+    compiled = compile_document(document)
+    for label, doc in (('padrão', document), ('compilado', compiled)):
+        print('%-10s tempo=%7.1f ms' % (label, timeit(lambda: run(doc))))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/query_plans.py
+# Roda os resolvers mais usados, captura o SQL emitido e confere com
+# EXPLAIN QUERY PLAN que nenhum deles faz varredura completa da tabela de
+# contratos. Sai com erro se algum plano regredir para SCAN.
+#
+#   python -m benchmarks.query_plans
+import datetime
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import seed
+from database import engine, db_session
+from pagination import encode_cursor
+from schema import schema
+
+OPERATIONS = [
+    ('getContractsByUser', '{ getContractsByUser(user_id: 1, limit: 10) { Contracts { id } nextToken } }'),
+    ('getContractsByUser (página 2)', '{ getContractsByUser(user_id: 1, limit: 10, nextToken: "%s") { Contracts { id } } }'
+        % encode_cursor([datetime.datetime(2024, 1, 1, 0, 20), 20])),
+    ('contracts por usuário', '{ contracts(filter: {user_id: "1"}) { id } }'),
+    ('deleteUser', 'mutation { deleteUser(id: 2) { success } }'),
+]
+
+def capture(query):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'contracts' in statement:
+            # Em executemany basta o plano do primeiro conjunto de parâmetros
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    db_session.remove()
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = schema.execute(query, context={})
+        assert not result.errors, result.errors
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+def full_scans(statement, parameters):
+    with engine.connect() as conn:
+        plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return [row[-1] for row in plan if row[-1].startswith(('SCAN contracts', 'SCAN TABLE contracts'))]
+
+def main():
+    seed(50, 5000)
+    failed = False
+    for label, query in OPERATIONS:
+        for statement, parameters in capture(query):
+            scans = full_scans(statement, parameters)
+            print('%-5s %s: %s' % ('ERRO' if scans else 'ok', label, ' '.join(statement.split())[:90]))
+            for detail in scans:
+                print('      ' + detail)
+            failed = failed or bool(scans)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# benchmarks/relationship_batching.py
+# Verifica que `users { contracts { user } }` emite um número constante de
+# comandos SQL, independente da quantidade de usuários. Com SQL_BATCHING=0
+# o número cresce com os usuários e a verificação falha.
+#
+#   python -m benchmarks.relationship_batching
+import sys
+
+from benchmarks.common import seed, count_queries, timeit
+from database import db_session
+from schema import schema
+
+QUERY = '{ users { id contracts { id user { id } } } }'
+
+def run():
+    db_session.remove()
+    result = schema.execute(QUERY, context={})
+    assert not result.errors, result.errors
+
+def main():
+    counts = set()
+    for users in (10, 50, 200):
+        seed(users, users * 5)
+        with count_queries() as counter:
+            run()
+        counts.add(counter['count'])
+        print('usuarios=%4d  consultas=%4d  tempo=%7.1f ms' % (users, counter['count'], timeit(run)))
+    if len(counts) != 1:
+        print('ERRO: número de consultas varia com a quantidade de usuários')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/response_cache.py
+# Requisições repetidas de getContract(id) e getContractsByUser(user_id)
+# (100 ids, cada um pedido 10 vezes) com e sem o cache de respostas, e o
+# custo de uma mutation no meio da carga (invalidação por tabela).
+#
+#   python -m benchmarks.response_cache
+import json
+import os
+import time
+
+os.environ.setdefault('RESPONSE_CACHE', '1')
+
+from benchmarks.common import count_queries, seed
+from app import app, document_cache, response_cache
+from database import db_session
+from schema import schema
+from view import GraphQLView
+
+IDS = 100
+ROUNDS = 10
+
+GET_CONTRACT = '''
+query ($id: ID!) { getContract(id: $id) { contract_id description amount created_at user { id name } } }
+'''
+
+GET_CONTRACTS_BY_USER = '''
+query ($id: ID!) { getContractsByUser(user_id: $id, limit: 20) { Contracts { id description amount } nextToken } }
+'''
+
+UPDATE_CONTRACT = '''
+mutation { updateContract(id: 1, input: {amount: 1.5}) { contract { id } } }
+'''
+
+# Mesmo endpoint, sem o cache de respostas
+app.add_url_rule('/graphql-uncached', view_func=GraphQLView.as_view(
+    'graphql-uncached', schema=schema, backend=document_cache))
+
+def post(client, path, query, variables=None):
+    response = client.post(path, data=json.dumps({'query': query, 'variables': variables or {}}),
+                           content_type='application/json')
+    assert response.status_code == 200, response.data
+    db_session.remove()
+
+def load(client, path, mutate=False):
+    for round_number in range(ROUNDS):
+        if mutate and round_number == ROUNDS // 2:
+            post(client, path, UPDATE_CONTRACT)
+        for id in range(1, IDS + 1):
+            post(client, path, GET_CONTRACT, {'id': id})
+            post(client, path, GET_CONTRACTS_BY_USER, {'id': id})
+
+def main():
+    seed(IDS, 20000)
+    client = app.test_client()
+    for label, path, mutate in (('sem cache', '/graphql-uncached', False), ('cache', '/graphql', False),
+                                ('cache+mutation', '/graphql', True)):
+        hits, misses = response_cache.hits, response_cache.misses
+        with count_queries() as queries:
+            start = time.perf_counter()
+            load(client, path, mutate)
+            elapsed = time.perf_counter() - start
+        requests = ROUNDS * IDS * 2
+        print('%-15s requisições=%d  tempo=%7.1f ms  por requisição=%6.3f ms  SQL=%5d  acertos=%d  faltas=%d' % (
+            label, requests, elapsed * 1000, elapsed * 1000 / requests, queries['count'],
+            response_cache.hits - hits, response_cache.misses - misses))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/sqlite_profile.py
+# Carga mista de leitura e escrita com cada perfil do SQLite: leitores
+# paginando contratos e escritores criando contratos, em threads, por um
+# tempo fixo. Cada perfil roda em um processo (o engine é criado na
+# importação) com um banco novo.
+#
+#   python -m benchmarks.sqlite_profile
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+READERS = 4
+WRITERS = 2
+DURATION = 3.0
+
+READ = '''
+query ($user: ID!) {
+  getContractsByUser(user_id: $user, limit: 20) { Contracts { id amount } nextToken }
+}
+'''
+
+WRITE = '''
+mutation ($user: ID!) {
+  createContract(input: {description: "bench", user_id: $user, created_at: "2024-06-01T00:00:00",
+                         fidelity: 12, amount: 10.0}) { id }
+}
+'''
+
+def worker(query, counts, index, deadline):
+    from database import db_session
+    from schema import schema
+    n = 0
+    while time.time() < deadline:
+        result = schema.execute(query, variables={'user': n % 50 + 1}, context={})
+        db_session.remove()
+        assert not result.errors, result.errors
+        n += 1
+    counts[index] = n
+
+def child():
+    from benchmarks.common import seed
+    seed(50, 20000)
+    deadline = time.time() + DURATION
+    counts = [0] * (READERS + WRITERS)
+    threads = [
+        threading.Thread(target=worker, args=(READ if i < READERS else WRITE, counts, i, deadline))
+        for i in range(READERS + WRITERS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps([sum(counts[:READERS]) / DURATION, sum(counts[READERS:]) / DURATION]))
+
+def main():
+    for profile in ('default', 'tuned'):
+        fd, path = tempfile.mkstemp(prefix='bench-', suffix='.db')
+        os.close(fd)
+        env = dict(os.environ, SQLITE_PROFILE=profile, DATABASE_URL='sqlite:///' + path)
+        try:
+            output = subprocess.check_output([sys.executable, '-m', 'benchmarks.sqlite_profile', 'child'], env=env)
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        reads, writes = json.loads(output.decode('utf8').strip().splitlines()[-1])
+        print('%-8s leituras=%8.1f/s  escritas=%7.1f/s' % (profile, reads, writes))
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['child']:
+        child()
+    else:
+        main()
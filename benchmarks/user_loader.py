@@ -0,0 +1,35 @@
+# benchmarks/user_loader.py
+# Compara GetContract.user com e sem o agrupamento do UserLoader:
+# 1000 contratos distribuídos entre 50 usuários.
+#
+#   python -m benchmarks.user_loader
+from benchmarks.common import seed, count_queries, timeit
+from database import db_session
+from loaders import Loaders
+from schema import schema
+
+USERS = 50
+CONTRACTS = 1000
+
+QUERY = '{ %s }' % ' '.join(
+    'c%d: getContract(id: %d) { contract_id user { id name } }' % (i, i)
+    for i in range(1, CONTRACTS + 1)
+)
+
+def run(batch):
+    db_session.remove()
+    loaders = Loaders()
+    loaders.user.batch = batch
+    result = schema.execute(QUERY, context={'loaders': loaders})
+    assert not result.errors, result.errors
+
+def main():
+    seed(USERS, CONTRACTS)
+    for label, batch in (('sem lote', False), ('com lote', True)):
+        with count_queries() as counter:
+            run(batch)
+        elapsed = timeit(lambda: run(batch))
+        print('%-10s consultas=%5d  tempo=%8.1f ms' % (label, counter['count'], elapsed))
+
+if __name__ == '__main__':
+    main()
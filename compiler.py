@@ -0,0 +1,302 @@
+# compiler.py
+# Compila documentos muito usados em código Python especializado: a
+# resolução dos campos, a coerção dos argumentos e a serialização dos
+# escalares ficam inline, sem passar por execute_fields / complete_value
+# nem criar uma Promise por campo.
+#
+# Só documentos simples são compilados (uma única operação query, sem
+# fragmentos nem diretivas, sem tipos abstratos). Erros durante a execução
+# (em resolvers, valores inválidos, null em campo não nulo) são tratados
+# como no executor padrão: vão para ExecutionResult.errors e o null sobe até
+# o campo mais próximo que aceita null. A operação nunca é executada duas
+# vezes.
+import logging
+from functools import partial
+from traceback import format_exception
+
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver
+from graphene_sqlalchemy.resolvers import get_attr_resolver
+from graphql.backend.compiled import GraphQLCompiledDocument
+from graphql.error import GraphQLError, GraphQLLocatedError
+from graphql.execution import ExecutionResult
+from graphql.execution.base import ResolveInfo
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.language import ast
+from graphql.type import (
+    GraphQLEnumType,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+)
+from promise import is_thenable
+
+logger = logging.getLogger(__name__)
+# Logger em que o executor padrão registra os erros de resolvers
+executor_logger = logging.getLogger('graphql.execution.utils')
+
+# Escalares cujo valor já serializado tem exatamente este tipo Python
+NATIVE_SCALARS = {'String': 'str', 'ID': 'str', 'Float': 'float', 'Boolean': 'bool'}
+
+_sqlalchemy_attr_code = get_attr_resolver(None, None).__code__
+
+class NotCompilable(Exception):
+    pass
+
+def attribute_access(resolver):
+    # Reconhece os resolvers padrão (leitura de atributo) do graphene e do
+    # graphene-sqlalchemy e retorna (nome do atributo, valor padrão, aceita dict)
+    if isinstance(resolver, partial) and resolver.func in (dict_or_attr_resolver, attr_resolver):
+        attname, default_value = resolver.args
+        return attname, default_value, resolver.func is dict_or_attr_resolver
+    if getattr(resolver, '__code__', None) is _sqlalchemy_attr_code:
+        return resolver.__closure__[0].cell_contents, None, False
+    return None
+
+class CodeGenerator(object):
+    def __init__(self, schema, operation):
+        self.schema = schema
+        self.operation = operation
+        self.lines = []
+        self.namespace = {}
+        self.counter = 0
+
+    def name(self, prefix):
+        self.counter += 1
+        return '%s_%d' % (prefix, self.counter)
+
+    def const(self, prefix, value):
+        name = self.name(prefix)
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def generate(self):
+        root_type = self.schema.get_query_type()
+        has_variables = bool(self.operation.variable_definitions)
+        if has_variables:
+            self.namespace['coerce_variables'] = partial(
+                get_variable_values, self.schema, self.operation.variable_definitions)
+
+        # Erros nas variáveis são do cliente: saem de prepare, fora da
+        # execução compilada, como no executor padrão
+        self.emit(0, 'def prepare(variable_values):')
+        self.emit(1, 'return coerce_variables(variable_values)' if has_variables else 'return {}')
+        self.emit(0, 'def run(root_value, context_value, variables, errors):')
+        self.emit_selection(root_type, self.operation.selection_set, 'root_value', 'data', 1, [])
+        self.emit(1, 'return data')
+        return '\n'.join(self.lines) + '\n'
+
+    def emit_selection(self, parent_type, selection_set, source, target, indent, path):
+        fields = []
+        for selection in selection_set.selections:
+            if not isinstance(selection, ast.Field) or selection.directives:
+                raise NotCompilable('fragments and directives are not compiled')
+            response_name = (selection.alias or selection.name).value
+            if response_name in [name for name, _ in fields]:
+                raise NotCompilable('merged fields are not compiled')
+            value = self.name('v')
+            self.emit_field(parent_type, selection, source, value, indent, path + [repr(response_name)])
+            fields.append((response_name, value))
+        self.emit(indent, '%s = {%s}' % (target, ', '.join('%r: %s' % field for field in fields)))
+
+    def emit_field(self, parent_type, field_ast, source, target, indent, path):
+        # path: expressões (nomes e índices das listas) do caminho do campo
+        field_name = field_ast.name.value
+        if field_name == '__typename':
+            self.emit(indent, '%s = %r' % (target, parent_type.name))
+            return
+        field_def = parent_type.fields.get(field_name)
+        if field_def is None:
+            raise NotCompilable('unknown field %s' % field_name)
+
+        # Como no executor padrão: em campos que aceitam null, o erro é
+        # registrado e o campo fica null; nos não nulos, sobe para o pai
+        nullable = not isinstance(field_def.type, GraphQLNonNull)
+        if nullable:
+            self.emit(indent, 'try:')
+            indent += 1
+        field_asts = self.const('field_asts', [field_ast])
+        path_code = '[%s]' % ', '.join(path)
+
+        self.emit(indent, 'try:')
+        access = attribute_access(field_def.resolver)
+        if access and not field_ast.arguments:
+            attname, default_value, accepts_dict = access
+            default = self.const('default', default_value) if default_value is not None else 'None'
+            if accepts_dict:
+                self.emit(indent + 1, '%s = %s.get(%r, %s) if isinstance(%s, dict) else getattr(%s, %r, %s)' % (
+                    target, source, attname, default, source, source, attname, default))
+            else:
+                self.emit(indent + 1, '%s = getattr(%s, %r, %s)' % (target, source, attname, default))
+        else:
+            resolver = self.const('resolver', field_def.resolver)
+            info = self.const('info', partial(
+                ResolveInfo, field_name, [field_ast], field_def.type, parent_type,
+                schema=self.schema, fragments={}, operation=self.operation))
+            if not field_def.args:
+                args = ''
+            elif any(self.has_variables(argument.value) for argument in field_ast.arguments or []):
+                # Argumentos com variáveis: coerção a cada execução
+                args = ', **get_argument_values(%s, %s, variables)' % (
+                    self.const('arg_defs', field_def.args), self.const('arg_asts', field_ast.arguments))
+                self.namespace['get_argument_values'] = get_argument_values
+            else:
+                # Argumentos literais: coerção feita uma única vez, na compilação
+                args = ', **%s' % self.const('args', get_argument_values(field_def.args, field_ast.arguments, {}))
+            self.emit(indent + 1, '%s = %s(%s, %s(root_value=root_value, variable_values=variables, context=context_value, path=%s)%s)' % (
+                target, resolver, source, info, path_code, args))
+            self.emit(indent + 1, 'if is_thenable(%s): %s = wait_for(%s, state)' % (target, target, target))
+        self.emit(indent, 'except Exception as e:')
+        self.emit(indent + 1, 'raise GraphQLLocatedError(%s, original_error=e, path=%s)' % (field_asts, path_code))
+        self.emit_complete(field_def.type, parent_type, field_ast, target, indent, path)
+
+        if nullable:
+            self.emit(indent - 1, 'except Exception as e:')
+            self.emit(indent, 'report_error(errors, e)')
+            self.emit(indent, '%s = None' % target)
+
+    def has_variables(self, value):
+        if isinstance(value, ast.Variable):
+            return True
+        if isinstance(value, ast.ListValue):
+            return any(self.has_variables(item) for item in value.values)
+        if isinstance(value, ast.ObjectValue):
+            return any(self.has_variables(field.value) for field in value.fields)
+        return False
+
+    def emit_complete(self, return_type, parent_type, field_ast, value, indent, path):
+        path_code = '[%s]' % ', '.join(path)
+        if isinstance(return_type, GraphQLNonNull):
+            self.emit_complete(return_type.of_type, parent_type, field_ast, value, indent, path)
+            message = self.const('message', 'Cannot return null for non-nullable field {}.{}.'.format(
+                parent_type, field_ast.name.value))
+            self.emit(indent, 'if %s is None: raise GraphQLError(%s, %s, path=%s)' % (
+                value, message, self.const('field_asts', [field_ast]), path_code))
+            return
+
+        self.emit(indent, 'if %s is not None:' % value)
+        if isinstance(return_type, GraphQLList):
+            items, item, index = self.name('items'), self.name('item'), self.name('index')
+            item_nullable = not isinstance(return_type.of_type, GraphQLNonNull)
+            self.emit(indent + 1, '%s = []' % items)
+            self.emit(indent + 1, 'for %s, %s in enumerate(%s):' % (index, item, value))
+            item_indent = indent + 2
+            if item_nullable:
+                self.emit(item_indent, 'try:')
+                item_indent += 1
+            self.emit_complete(return_type.of_type, parent_type, field_ast, item, item_indent, path + [index])
+            if item_nullable:
+                self.emit(indent + 2, 'except Exception as e:')
+                self.emit(indent + 3, 'report_error(errors, e)')
+                self.emit(indent + 3, '%s = None' % item)
+            self.emit(indent + 2, '%s.append(%s)' % (items, item))
+            self.emit(indent + 1, '%s = %s' % (value, items))
+        elif isinstance(return_type, (GraphQLScalarType, GraphQLEnumType)):
+            serialize = self.const('serialize', return_type.serialize)
+            native = NATIVE_SCALARS.get(return_type.name)
+            serialized = self.name('serialized')
+            if native:
+                self.emit(indent + 1, '%s = %s if type(%s) is %s else %s(%s)' % (
+                    serialized, value, value, native, serialize, value))
+            else:
+                self.emit(indent + 1, '%s = %s(%s)' % (serialized, serialize, value))
+            message = self.const('message', 'Expected a value of type "{}" but received: {{}}'.format(return_type))
+            self.emit(indent + 1, 'if %s is None: raise GraphQLError(%s.format(%s), path=%s)' % (
+                serialized, message, value, path_code))
+            self.emit(indent + 1, '%s = %s' % (value, serialized))
+        elif isinstance(return_type, GraphQLObjectType):
+            if return_type.is_type_of:
+                is_type_of = self.const('is_type_of', return_type.is_type_of)
+                message = self.const('message', 'Expected value of type "{}" but got: {{}}.'.format(return_type))
+                self.emit(indent + 1, 'if not %s(%s, None): raise GraphQLError(%s.format(type(%s).__name__), %s)' % (
+                    is_type_of, value, message, value, self.const('field_asts', [field_ast])))
+            self.emit_selection(return_type, field_ast.selection_set, value, value, indent + 1, path)
+        else:
+            raise NotCompilable('abstract types are not compiled')
+
+def report_error(errors, error):
+    # Como ExecutionContext.report_error
+    executor_logger.error(''.join(format_exception(
+        type(error), error, getattr(error, 'stack', None) or error.__traceback__)))
+    errors.append(error)
+
+def wait_for(promise, state):
+    # Resolver que devolve Promise (ex.: um DataLoader): espera o valor aqui,
+    # sem o agrupamento entre campos, e as próximas execuções do documento
+    # passam a usar o executor padrão
+    if not state['deoptimized']:
+        logger.debug('Compiled document deoptimized')
+        state['deoptimized'] = True
+    return promise.get()
+
+def execute_compiled(prepare, run, fallback, state, operation_name_value, root_fields, root_value=None, context_value=None,
+                     variable_values=None, operation_name=None, middleware=None, executor=None,
+                     return_promise=False, **options):
+    # Aceita os mesmos parâmetros do execute do graphql-core (inclusive os
+    # aliases root/context/variables usados pelo graphql-server)
+    root_value = options.pop('root', root_value)
+    context_value = options.pop('context', context_value)
+    variable_values = options.pop('variables', variable_values)
+    kwargs = dict(options, root_value=root_value, context_value=context_value,
+                  variable_values=variable_values, operation_name=operation_name,
+                  middleware=middleware, return_promise=return_promise)
+    if executor is not None:
+        kwargs['executor'] = executor
+
+    # Com um único campo raiz não há o que o executor paralelizar: o código
+    # compilado roda inline do mesmo jeito
+    if (state['deoptimized'] or middleware or (executor and root_fields > 1) or return_promise or options
+            or operation_name not in (None, operation_name_value)):
+        return fallback(**kwargs)
+    variables = prepare(variable_values)
+    errors = []
+    try:
+        data = run(root_value, context_value, variables, errors)
+    except Exception as e:
+        # Erro em campo raiz não nulo: a resposta inteira fica null
+        report_error(errors, e)
+        data = None
+    return ExecutionResult(data=data, errors=errors or None)
+
+def compile_document(document):
+    # Retorna um GraphQLCompiledDocument ou None se o documento não é suportado
+    operations = [
+        definition for definition in document.document_ast.definitions
+        if isinstance(definition, ast.OperationDefinition)
+    ]
+    if len(operations) != 1 or len(operations) != len(document.document_ast.definitions):
+        return None
+    operation = operations[0]
+    if operation.operation != 'query' or operation.directives:
+        return None
+
+    generator = CodeGenerator(document.schema, operation)
+    try:
+        code = generator.generate()
+    except NotCompilable as e:
+        logger.debug('Document not compiled: %s', e)
+        return None
+
+    code += (
+        'def execute(*args, **kwargs):\n'
+        '    return execute_compiled(prepare, run, fallback, state, operation_name_value, root_fields, *args, **kwargs)\n'
+    )
+    namespace = dict(
+        generator.namespace,
+        is_thenable=is_thenable,
+        GraphQLError=GraphQLError,
+        GraphQLLocatedError=GraphQLLocatedError,
+        report_error=report_error,
+        wait_for=wait_for,
+        execute_compiled=execute_compiled,
+        fallback=document.execute,
+        state={'deoptimized': False},
+        operation_name_value=operation.name.value if operation.name else None,
+        root_fields=len(operation.selection_set.selections),
+        document_string=document.document_string,
+        document_ast=document.document_ast,
+    )
+    return GraphQLCompiledDocument.from_code(document.schema, code, extra_namespace=namespace)
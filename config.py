@@ -0,0 +1,91 @@
+# config.py
+import os
+
+# URL do banco de dados (padrão: arquivo SQLite local)
+DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+
+# Perfil do SQLite aplicado a cada conexão: 'tuned' (WAL,
+# synchronous=NORMAL, mmap, cache de páginas maior, conexões reaproveitadas)
+# ou 'default' (padrões do SQLite e do SQLAlchemy)
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'tuned')
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', '5'))
+
+# Separação de leitura e escrita: operações query usam conexões somente
+# leitura (READ_DATABASE_URL, ex.: uma réplica; sem ela, o arquivo SQLite em
+# mode=ro) e mutations usam o engine principal
+READ_WRITE_SPLIT = os.environ.get('READ_WRITE_SPLIT', '1') != '0'
+READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL') or None
+
+# Threads do pool em que os campos raiz das queries acessam o banco quando
+# resolvidos em paralelo (executors.py)
+DB_THREAD_POOL_SIZE = int(os.environ.get('DB_THREAD_POOL_SIZE', '8'))
+# No app Flask: resolve os campos raiz em paralelo nesse pool, com no máximo
+# MAX_REQUEST_CONCURRENCY campos de uma mesma requisição ao mesmo tempo
+PARALLEL_RESOLVERS = os.environ.get('PARALLEL_RESOLVERS', '1') != '0'
+MAX_REQUEST_CONCURRENCY = int(os.environ.get('MAX_REQUEST_CONCURRENCY', '4'))
+
+# Confere a versão do schema do banco ao iniciar a aplicação e cria/atualiza
+# as tabelas se preciso (DB_BOOTSTRAP=0 quando o deploy já roda migrate_db.py)
+DB_BOOTSTRAP = os.environ.get('DB_BOOTSTRAP', '1') != '0'
+
+# Carregamento em lote dos relacionamentos (SQL_BATCHING=0 volta ao lazy load)
+SQL_BATCHING = os.environ.get('SQL_BATCHING', '1') != '0'
+
+# Paginação: tamanho padrão e máximo de página aceito pelo servidor
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '1000'))
+
+# Análise de custo das operações (ver cost.py): custo e profundidade
+# máximos (0 desativa)
+MAX_QUERY_COST = int(os.environ.get('MAX_QUERY_COST', '50000'))
+MAX_QUERY_DEPTH = int(os.environ.get('MAX_QUERY_DEPTH', '10'))
+
+# Mutações em lote: número máximo de itens por chamada
+MAX_BULK_SIZE = int(os.environ.get('MAX_BULK_SIZE', '10000'))
+
+# Cache de documentos (queries já analisadas e validadas): número máximo de
+# documentos e tamanho total do texto das queries guardadas
+DOCUMENT_CACHE_SIZE = int(os.environ.get('DOCUMENT_CACHE_SIZE', '1000'))
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get('DOCUMENT_CACHE_MAX_BYTES', str(10 * 1024 * 1024)))
+
+# Cache de respostas de operações query (ver response_cache.py), desligado
+# por padrão: validade em segundos, número máximo de respostas e tamanho
+# total do JSON guardado
+RESPONSE_CACHE = os.environ.get('RESPONSE_CACHE', '0') == '1'
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '10000'))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Cache de entidades (linhas de users e contracts por chave primária, ver
+# entity_cache.py), desligado por padrão: só os commits deste processo o
+# invalidam. Número máximo de linhas guardadas
+ENTITY_CACHE = os.environ.get('ENTITY_CACHE', '0') == '1'
+ENTITY_CACHE_SIZE = int(os.environ.get('ENTITY_CACHE_SIZE', '100000'))
+
+# Persisted queries: diretório opcional onde as queries registradas são
+# gravadas (<sha256>.graphql) e modo allow-list, em que só executam hashes
+# já registrados
+PERSISTED_QUERIES_DIR = os.environ.get('PERSISTED_QUERIES_DIR') or None
+PERSISTED_QUERIES_SIZE = int(os.environ.get('PERSISTED_QUERIES_SIZE', '10000'))
+PERSISTED_QUERIES_ONLY = os.environ.get('PERSISTED_QUERIES_ONLY', '0') == '1'
+
+# Número de usos a partir do qual um documento é compilado (0 desativa)
+QUERY_COMPILE_THRESHOLD = int(os.environ.get('QUERY_COMPILE_THRESHOLD', '10'))
+
+# Caminho rápido para completar listas de objetos planos no executor padrão
+FAST_LIST_COMPLETION = os.environ.get('FAST_LIST_COMPLETION', '1') != '0'
+
+# Batching HTTP: várias operações em uma requisição (lista JSON), com limite
+# de operações por lote
+GRAPHQL_BATCH = os.environ.get('GRAPHQL_BATCH', '1') != '0'
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '50'))
+
+# Codificação JSON das respostas: 'auto' (orjson se instalado), 'orjson' ou
+# 'json'. Respostas com alguma lista de JSON_STREAM_THRESHOLD itens ou mais
+# são enviadas em pedaços de JSON_STREAM_CHUNK itens (0 desativa)
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'auto')
+JSON_STREAM_THRESHOLD = int(os.environ.get('JSON_STREAM_THRESHOLD', '5000'))
+JSON_STREAM_CHUNK = int(os.environ.get('JSON_STREAM_CHUNK', '1000'))
@@ -0,0 +1,184 @@
+# cost.py
+# Análise estática de custo das operações, feita na validação (antes da
+# execução). O custo estima quantos objetos a operação pode produzir: cada
+# campo que devolve objetos custa o número de objetos e os campos abaixo
+# dele são multiplicados por esse número. O tamanho de cada lista é o que o
+# resolver garante: o argumento de página (first/limit, com o padrão e o
+# teto dos resolvers) do próprio campo ou do campo pai (ex.:
+# getContractsByUser(limit) { Contracts }), ou o número de itens de um
+# argumento lista do campo pai (mutations em lote). Listas sem limite
+# conhecido valem MAX_PAGE_SIZE. Escalares e campos de introspecção não
+# custam nada.
+#
+# Tamanhos que vêm de variáveis só são conhecidos na execução: na
+# validação essas operações não são rejeitadas pelo custo, que é
+# calculado de novo com os valores recebidos (ver execution_cost).
+from graphql import GraphQLError
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull, GraphQLObjectType
+from graphql.validation.rules.base import ValidationRule
+
+from config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_QUERY_COST, MAX_QUERY_DEPTH
+
+# Argumentos que limitam o tamanho das listas devolvidas
+SIZE_ARGUMENTS = ('first', 'limit')
+
+def unwrap(field_type):
+    # Retorna (tipo nomeado, se é lista)
+    is_list = False
+    while isinstance(field_type, (GraphQLList, GraphQLNonNull)):
+        is_list = is_list or isinstance(field_type, GraphQLList)
+        field_type = field_type.of_type
+    return field_type, is_list
+
+class OperationCost(object):
+    def __init__(self, schema, operation, fragments, variables=None):
+        self.schema = schema
+        self.fragments = fragments
+        # Valores das variáveis na execução; None na validação
+        self.variables = variables
+        self.variable_defaults = dict(
+            (definition.variable.name.value, definition.default_value)
+            for definition in operation.variable_definitions or []
+        )
+        # Se algum tamanho veio de uma variável
+        self.uses_variables = False
+
+    def argument_value(self, value):
+        # Inteiro ou lista de um argumento de tamanho; None se ausente (ou
+        # variável sem valor conhecido)
+        if isinstance(value, ast.Variable):
+            name = value.name.value
+            self.uses_variables = True
+            if self.variables is not None and self.variables.get(name) is not None:
+                return self.variables[name]
+            value = self.variable_defaults.get(name)
+        if isinstance(value, ast.IntValue):
+            return int(value.value)
+        if isinstance(value, ast.ListValue):
+            return value.values
+        return None
+
+    def list_size(self, field_def, field_ast):
+        # Tamanho das listas do campo pelos argumentos; None se nenhum o limita
+        values = dict((argument.name.value, argument.value) for argument in field_ast.arguments or [])
+        for name in SIZE_ARGUMENTS:
+            if name in field_def.args:
+                size = self.argument_value(values.get(name))
+                if not isinstance(size, int):
+                    return DEFAULT_PAGE_SIZE
+                return max(1, min(size, MAX_PAGE_SIZE))
+        for name, argument in field_def.args.items():
+            if unwrap(argument.type)[1]:
+                items = self.argument_value(values.get(name))
+                if isinstance(items, (list, tuple)):
+                    return len(items)
+        return None
+
+    def collect_fields(self, selection_set, visited):
+        # Campos da seleção, expandindo fragmentos (sem olhar as condições
+        # de tipo: o custo é um limite superior)
+        fields = []
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                fields.append(selection)
+            elif isinstance(selection, ast.InlineFragment):
+                fields += self.collect_fields(selection.selection_set, visited)
+            elif isinstance(selection, ast.FragmentSpread):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # Ciclos entre fragmentos são reportados por NoFragmentCycles
+                if fragment is not None and name not in visited:
+                    fields += self.collect_fields(fragment.selection_set, visited | {name})
+        return fields
+
+    def selection_cost(self, parent_type, selection_set, size_hint, depth):
+        # Retorna (custo, profundidade máxima) da seleção
+        cost, max_depth = 0, depth
+        if not isinstance(parent_type, GraphQLObjectType) or selection_set is None:
+            return cost, max_depth
+        for field_ast in self.collect_fields(selection_set, frozenset()):
+            name = field_ast.name.value
+            field_def = parent_type.fields.get(name)
+            if name.startswith('__') or field_def is None:
+                continue
+            named_type, is_list = unwrap(field_def.type)
+            if not isinstance(named_type, GraphQLObjectType):
+                continue
+            size = self.list_size(field_def, field_ast)
+            if not is_list:
+                count = 1
+            elif size is not None:
+                count = size
+            elif size_hint is not None:
+                count = size_hint
+            else:
+                count = MAX_PAGE_SIZE
+            child_cost, child_depth = self.selection_cost(
+                named_type, field_ast.selection_set, None if is_list else size, depth + 1)
+            cost += count + count * child_cost
+            max_depth = max(max_depth, child_depth)
+        return cost, max_depth
+
+def operation_cost(schema, operation, fragments, variables=None):
+    # Retorna (custo, profundidade, se depende de variáveis) de uma operação
+    root_type = {
+        'query': schema.get_query_type(),
+        'mutation': schema.get_mutation_type(),
+        'subscription': schema.get_subscription_type(),
+    }.get(operation.operation)
+    walker = OperationCost(schema, operation, fragments, variables)
+    cost, depth = walker.selection_cost(root_type, operation.selection_set, None, 0)
+    return cost, depth, walker.uses_variables
+
+def cost_error(cost, operation, max_cost=MAX_QUERY_COST):
+    if max_cost and cost > max_cost:
+        return GraphQLError(
+            'Query cost {} exceeds the maximum allowed cost of {}.'.format(cost, max_cost), [operation])
+    return None
+
+def execution_cost(schema, document_ast, operation_name, variables):
+    # Custo de uma operação com os valores das variáveis recebidos; retorna
+    # (custo, erro se passa do máximo)
+    fragments = {}
+    operation = None
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            fragments[definition.name.value] = definition
+        elif isinstance(definition, ast.OperationDefinition):
+            if operation_name is None or (definition.name and definition.name.value == operation_name):
+                operation = definition
+    cost, _, _ = operation_cost(schema, operation, fragments, variables or {})
+    return cost, cost_error(cost, operation)
+
+# Regra de validação que rejeita operações acima do custo ou da
+# profundidade máximos (0 desativa cada limite). Se costs for informado,
+# recebe {nome da operação: custo} de cada operação analisada, com None
+# para as que dependem de variáveis (o custo é verificado na execução)
+class CostAnalysis(ValidationRule):
+    __slots__ = ('costs', 'max_cost', 'max_depth')
+
+    def __init__(self, context, costs=None, max_cost=MAX_QUERY_COST, max_depth=MAX_QUERY_DEPTH):
+        super(CostAnalysis, self).__init__(context)
+        self.costs = costs if costs is not None else {}
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+
+    def enter_Document(self, node, key, parent, path, ancestors):
+        fragments = dict(
+            (definition.name.value, definition) for definition in node.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        )
+        for operation in node.definitions:
+            if not isinstance(operation, ast.OperationDefinition):
+                continue
+            cost, depth, uses_variables = operation_cost(self.context.get_schema(), operation, fragments)
+            self.costs[operation.name.value if operation.name else None] = None if uses_variables else cost
+            if self.max_depth and depth > self.max_depth:
+                self.context.report_error(GraphQLError(
+                    'Query depth {} exceeds the maximum allowed depth of {}.'.format(depth, self.max_depth),
+                    [operation]))
+            error = None if uses_variables else cost_error(cost, operation, self.max_cost)
+            if error is not None:
+                self.context.report_error(error)
+        return False
@@ -1,13 +1,235 @@
 # database.py
-from sqlalchemy import create_engine
+import contextlib
+import contextvars
+import itertools
+import threading
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from config import (
+    DATABASE_URL,
+    READ_DATABASE_URL,
+    READ_WRITE_SPLIT,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_POOL_SIZE,
+    SQLITE_PROFILE,
+)
+
+# PRAGMAs executados em cada conexão nova, por perfil. Com WAL os leitores
+# não bloqueiam o escritor (nem o contrário) e, com synchronous=NORMAL, o
+# commit não faz fsync (só o checkpoint do WAL)
+SQLITE_PROFILES = {
+    'default': [],
+    'tuned': [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', SQLITE_MMAP_SIZE),
+        ('cache_size', -SQLITE_CACHE_SIZE_KB),
+        ('temp_store', 'MEMORY'),
+        ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+    ],
+}
+
+# PRAGMAs que alteram o arquivo: só o engine de escrita os aplica
+WRITE_PRAGMAS = ('journal_mode', 'synchronous')
+
+def create_db_engine(url=DATABASE_URL, profile=SQLITE_PROFILE, read_only=False):
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(url)
+    if profile not in SQLITE_PROFILES:
+        raise ValueError('Unknown SQLite profile: %s' % profile)
+    pragmas = [(name, value) for name, value in SQLITE_PROFILES[profile]
+               if not (read_only and name in WRITE_PRAGMAS)]
+    if not pragmas:
+        return create_engine(url)
+
+    options = {}
+    if url.database not in (None, '', ':memory:'):
+        # O SQLAlchemy abre uma conexão nova por sessão com arquivos SQLite
+        # (NullPool); o cache de páginas e o mmap só valem a pena se a
+        # conexão for reaproveitada. Cada conexão é usada por uma thread de
+        # cada vez (scoped_session), então pode voltar ao pool em outra
+        options.update(
+            poolclass=QueuePool,
+            pool_size=SQLITE_POOL_SIZE,
+            connect_args={'check_same_thread': False},
+        )
+    engine = create_engine(url, **options)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+        cursor.close()
+
+    return engine
 
-engine = create_engine('sqlite:///database.db')
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+def read_only_url(url):
+    # URL das leituras: READ_DATABASE_URL (ex.: uma réplica) ou, para um
+    # arquivo SQLite, o mesmo arquivo aberto em modo somente leitura
+    if READ_DATABASE_URL:
+        return make_url(READ_DATABASE_URL)
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        return None
+    return url.set(database='file:' + url.database, query={'mode': 'ro', 'uri': 'true'})
+
+engine = create_db_engine()
+read_url = read_only_url(DATABASE_URL) if READ_WRITE_SPLIT else None
+read_engine = create_db_engine(read_url, read_only=True) if read_url else engine
+
+# Sessão que escolhe o engine pela operação: com session.info['read_only']
+# (operações query, ver read_only_session) as consultas vão para o engine
+# de leitura; mutations, flush e qualquer uso fora do GraphQL usam o de
+# escrita
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get('read_only') and not self._flushing:
+            return read_engine
+        return engine
+
+# Escopo da sessão: uma por thread ou, dentro de request_session() (usado
+# pelo ASGI, em que as requisições dividem a thread do loop), uma por
+# requisição. O contextvar acompanha os callbacks agendados pela requisição
+_request_scope = contextvars.ContextVar('session_scope', default=None)
+
+def session_scope():
+    scope = _request_scope.get()
+    return threading.get_ident() if scope is None else scope
+
+db_session = scoped_session(
+    sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False),
+    scopefunc=session_scope,
+)
 Base = declarative_base()
 Base.query = db_session.query_property()
 
-def init_db():
+@contextlib.contextmanager
+def read_only_session():
+    session = db_session()
+    previous = session.info.get('read_only', False)
+    session.info['read_only'] = True
+    try:
+        yield session
+    finally:
+        session.info['read_only'] = previous
+
+@contextlib.contextmanager
+def request_session():
+    # Sessão própria para o código executado no bloco (e nos callbacks que
+    # ele agendar), removida no fim
+    token = _request_scope.set(object())
+    try:
+        yield
+    finally:
+        remove_sessions()
+        _request_scope.reset(token)
+
+# Sessões de tarefas de leitura (ver executors.py e backend.wrap_execute):
+# cada tarefa tem um escopo próprio, com uma sessão somente leitura em modo
+# autocommit, que devolve a conexão ao pool depois de cada consulta sem
+# expirar os objetos carregados. Os objetos ficam válidos até o fim da
+# requisição, que ainda completa os valores (e pode disparar lazy loads):
+# a sessão é removida junto com a do escopo que criou a tarefa
+task_sessionmaker = sessionmaker(class_=RoutingSession, autocommit=True, autoflush=False)
+
+def start_task_scope():
+    _request_scope.set(object())
+    db_session.registry.set(task_sessionmaker(info={'read_only': True}))
+
+def task_scope():
+    # Cópia do contexto atual para context.run(fn, ...), com a sessão de uma
+    # tarefa nova
+    context = contextvars.copy_context()
+    context.run(start_task_scope)
+    db_session().info.setdefault('task_scopes', []).append(context)
+    return context
+
+def remove_sessions():
+    # Remove a sessão do escopo atual e as das tarefas criadas nele
+    if db_session.registry.has():
+        for context in db_session().info.pop('task_scopes', ()):
+            context.run(remove_sessions)
+    db_session.remove()
+
+# Escritas de cada sessão, entregues depois do commit às funções
+# registradas com on_commit (ex.: o cache de respostas) como
+# {tabela: chaves primárias alteradas}. INSERT/UPDATE/DELETE em massa
+# (db_session.execute) não informam as linhas: a tabela vem com None
+commit_listeners = []
+
+def on_commit(listener):
+    commit_listeners.append(listener)
+    return listener
+
+def mark_written(session, table, identity=None):
+    written = session.info.setdefault('written', {})
+    if identity is None:
+        written[table] = None
+    elif written.get(table, ()) is not None:
+        written.setdefault(table, set()).add(identity)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def track_flush(session, flush_context):
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        mapper = inspect(instance).mapper
+        mark_written(session, mapper.local_table.name, tuple(mapper.primary_key_from_instance(instance)))
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def track_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_written(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def notify_commit(session):
+    written = session.info.pop('written', None)
+    if written:
+        for listener in commit_listeners:
+            listener(written)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def discard_writes(session):
+    session.info.pop('written', None)
+
+# Versão do schema do banco: incrementar sempre que tabelas, colunas ou
+# índices de models.py mudarem. No SQLite fica em PRAGMA user_version
+SCHEMA_VERSION = 1
+
+def init_db(bind=engine):
     import models
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=bind)
+    # create_all não altera tabelas existentes: cria os índices que faltam
+    # em bancos criados antes deles
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def bootstrap_db():
+    # Cria/atualiza o schema só se a versão gravada no banco for antiga.
+    # Banco atualizado: uma única consulta. Retorna True se houve DDL
+    if engine.dialect.name != 'sqlite':
+        init_db()
+        return True
+    with engine.connect() as connection:
+        if connection.exec_driver_sql('PRAGMA user_version').scalar() >= SCHEMA_VERSION:
+            return False
+
+    # BEGIN IMMEDIATE pega o lock de escrita antes de conferir de novo a
+    # versão: processos iniciando juntos não disputam o DDL, o segundo só
+    # encontra o banco já atualizado. O DDL e a nova versão são gravados
+    # na mesma transação
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        with connection.begin():
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+            if connection.exec_driver_sql('PRAGMA user_version').scalar() >= SCHEMA_VERSION:
+                return False
+            init_db(bind=connection)
+            connection.exec_driver_sql('PRAGMA user_version = %d' % SCHEMA_VERSION)
+    return True
@@ -0,0 +1,80 @@
+# encoding.py
+# Codificação JSON das respostas. O codificador é plugável: orjson quando
+# estiver instalado (nativo), senão o json da biblioteca padrão, que usa o
+# codificador em C. Respostas grandes podem ser transmitidas em pedaços:
+# listas longas (como as de contratos planos) são codificadas em fatias de
+# linhas, então o texto completo da resposta nunca fica inteiro na memória.
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sem verificação de ciclos: o resultado da execução é sempre uma árvore
+_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False, ensure_ascii=False)
+
+def python_dumps(data):
+    return _encoder.encode(data)
+
+def native_dumps(data):
+    return orjson.dumps(data).decode('utf-8')
+
+def get_dumps(name='auto'):
+    # name: 'auto' (orjson se disponível), 'orjson' ou 'json'
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise ImportError('JSON_ENCODER=orjson requires the orjson package')
+        return native_dumps
+    return python_dumps
+
+def iter_encode(data, dumps, chunk_size):
+    # Gera o JSON de data em pedaços. Dicionários e listas longas são
+    # percorridos; o resto (inclusive fatias de chunk_size itens de uma lista
+    # longa) é codificado de uma vez por dumps
+    if isinstance(data, dict):
+        separator = '{'
+        for key, value in data.items():
+            yield separator + python_dumps(str(key)) + ':'
+            for chunk in iter_encode(value, dumps, chunk_size):
+                yield chunk
+            separator = ','
+        yield '{}' if separator == '{' else '}'
+    elif isinstance(data, (list, tuple)) and len(data) > chunk_size:
+        separator = '['
+        for start in range(0, len(data), chunk_size):
+            chunk = dumps(list(data[start:start + chunk_size]))
+            yield separator + chunk[1:-1]
+            separator = ','
+        yield ']'
+    else:
+        yield dumps(data)
+
+def has_long_list(data, threshold):
+    # Se alguma lista da resposta tem threshold itens ou mais
+    if isinstance(data, (list, tuple)):
+        if len(data) >= threshold:
+            return True
+        values = data
+    elif isinstance(data, dict):
+        values = data.values()
+    else:
+        return False
+    return any(has_long_list(value, threshold) for value in values if isinstance(value, (dict, list, tuple)))
+
+class ResponseEncoder(object):
+    # Substitui o json_encode do graphql-server: encode(data, pretty=False).
+    # Devolve uma string ou, para respostas com alguma lista de
+    # stream_threshold itens ou mais, um gerador de pedaços, que o Response
+    # do Flask envia como iterador WSGI
+    def __init__(self, name='auto', stream_threshold=None, chunk_size=1000):
+        self.dumps = get_dumps(name)
+        self.stream_threshold = stream_threshold
+        self.chunk_size = chunk_size
+
+    def __call__(self, data, pretty=False):
+        if pretty:
+            return json.dumps(data, indent=2, separators=(',', ': '))
+        if self.stream_threshold and has_long_list(data, self.stream_threshold):
+            return iter_encode(data, self.dumps, self.chunk_size)
+        return self.dumps(data)
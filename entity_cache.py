@@ -0,0 +1,130 @@
+# entity_cache.py
+# Cache de linhas de users e contracts por chave primária, compartilhado
+# pelo processo. Cada linha é guardada como uma tupla imutável (namedtuple
+# com as colunas do model), que os tipos GraphQL leem como leriam o objeto
+# do ORM, sem risco de uma requisição alterar o que outra vai ler.
+#
+# Os commits que alteram as tabelas (qualquer mutation, ver
+# database.on_commit) descartam as linhas alteradas ou, em escritas em
+# massa, todas as linhas da tabela. Uma leitura feita antes de um commit
+# não guarda o resultado se a tabela foi invalidada enquanto ela acontecia.
+# Mutations continuam lendo da sessão: precisam do objeto do ORM para
+# alterá-lo.
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from config import ENTITY_CACHE, ENTITY_CACHE_SIZE
+from database import on_commit
+from models import Contract as ContractModel, User as UserModel
+
+def primary_key(id):
+    # Chave inteira do id recebido (ID do GraphQL chega como texto); None se
+    # não é um id válido, e nesse caso não há linha com ele
+    if isinstance(id, int):
+        return id
+    return int(id) if isinstance(id, str) and id.isdigit() else None
+
+class EntityCache(object):
+    def __init__(self, models, max_size=ENTITY_CACHE_SIZE, enabled=ENTITY_CACHE):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.snapshot_types = dict(
+            (model, namedtuple(model.__name__ + 'Row', [column.key for column in model.__table__.columns]))
+            for model in models
+        )
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = Lock()
+
+    def snapshot(self, model, instance):
+        snapshot_type = self.snapshot_types[model]
+        return snapshot_type(*[getattr(instance, name) for name in snapshot_type._fields])
+
+    def row(self, model, instance):
+        # O que load devolveria para instance: a tupla, com o cache ligado,
+        # ou o próprio objeto do ORM
+        return self.snapshot(model, instance) if self.enabled else instance
+
+    def load(self, model, id):
+        if not self.enabled:
+            return model.query.get(id)
+        return self.load_many(model, [id])[0]
+
+    def load_many(self, model, ids):
+        # Linhas (ou None) na ordem de ids: as que estão no cache e as demais
+        # em um único SELECT ... WHERE id IN (...). Desligado, devolve os
+        # objetos do ORM, como antes
+        keys = [primary_key(id) for id in ids]
+        if not self.enabled:
+            valid = [key for key in keys if key is not None]
+            instances = model.query.filter(model.id.in_(valid)).all() if valid else []
+            by_key = dict((instance.id, instance) for instance in instances)
+            return [by_key.get(key) for key in keys]
+
+        table = model.__tablename__
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get((table, key)) if key is not None else None
+                if entry is not None:
+                    self.entries.move_to_end((table, key))
+                    found[key] = entry
+            self.hits += len(found)
+            missing = set(key for key in keys if key is not None and key not in found)
+            self.misses += len(missing)
+            generation = self.generations.get(table, 0)
+
+        if missing:
+            rows = [self.snapshot(model, instance)
+                    for instance in model.query.filter(model.id.in_(missing)).all()]
+            found.update((row.id, row) for row in rows)
+            self.store(table, rows, generation)
+        return [found.get(key) for key in keys]
+
+    def store(self, table, rows, generation):
+        with self.lock:
+            # A tabela foi alterada durante a leitura: as linhas podem ser antigas
+            if self.generations.get(table, 0) != generation:
+                return
+            for row in rows:
+                self.entries[(table, row.id)] = row
+                self.entries.move_to_end((table, row.id))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, written):
+        # Listener de database.on_commit: {tabela: chaves alteradas ou None}
+        with self.lock:
+            for table, identities in written.items():
+                self.generations[table] = self.generations.get(table, 0) + 1
+                if identities is None:
+                    keys = [key for key in self.entries if key[0] == table]
+                else:
+                    keys = [(table, identity[0]) for identity in identities]
+                for key in keys:
+                    if self.entries.pop(key, None) is not None:
+                        self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / float(lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+entity_cache = EntityCache((UserModel, ContractModel))
+on_commit(entity_cache.invalidate)
@@ -0,0 +1,194 @@
+# executors.py
+# Executores do graphql-core que resolvem em paralelo os campos raiz das
+# queries, que são os que consultam o banco. Os resolvers desses campos
+# rodam em um pool de threads persistente e limitado (DB_THREAD_POOL_SIZE,
+# o que também limita as conexões abertas); cada tarefa usa uma sessão de
+# tarefa (database.task_scope), somente leitura, que só segura a conexão
+# durante cada consulta. Os objetos devolvidos continuam ligados a ela
+# enquanto a requisição completa os valores; a sessão é removida no fim da
+# requisição. Mutations continuam em série: no Flask, na thread da
+# requisição; no ASGI, no pool, um campo de cada vez.
+#
+# O ThreadExecutor do graphql-core não serve: cria uma Thread por campo ou,
+# no modo pool, chama pool.map, que bloqueia até cada campo terminar.
+import contextlib
+import contextvars
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from graphql.execution.base import ResolveInfo
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from promise import Promise
+
+from config import DB_THREAD_POOL_SIZE, MAX_REQUEST_CONCURRENCY
+from database import task_scope
+
+db_pool = ThreadPoolExecutor(max_workers=DB_THREAD_POOL_SIZE, thread_name_prefix='db')
+
+def root_field_of(args):
+    # Tipo da operação ('query', 'mutation') se args são de um campo raiz
+    info = args[1] if len(args) > 1 else None
+    if isinstance(info, ResolveInfo) and len(info.path) == 1:
+        return info.operation.operation
+    return None
+
+def offloadable(args):
+    # args de executor.execute: (source, info) para campos; o graphql-server
+    # também passa pelo executor cada operação do lote, que segue inline
+    return root_field_of(args) == 'query'
+
+def run_in_session(context, fn, args, kwargs):
+    return context.run(fn, *args, **kwargs)
+
+# Executor da requisição ASGI em andamento (ver OffloadingAsyncioExecutor.activate)
+_current_executor = contextvars.ContextVar('offloading_executor', default=None)
+
+# Para o asgi.py: os campos raiz e as funções de lote dos loaders (run_batch)
+# rodam no pool, cada um em sua sessão de tarefa, sem bloquear o loop nem
+# segurar conexões entre os awaits; o resto da execução (completar valores)
+# segue no loop. Com SQL_BATCHING=0 os lazy loads ainda consultam no loop,
+# mas pela sessão de tarefa do objeto, que não segura a conexão.
+# Os campos raiz das mutations também rodam no pool (o SQL e o commit, que
+# pode esperar o busy_timeout do SQLite, não bloqueiam o loop), na sessão
+# da requisição. O graphql-core só resolve um campo depois de completar o
+# anterior, e as operações de um lote esperam pelas mutations (in_order),
+# então a sessão é usada por uma thread de cada vez
+class OffloadingAsyncioExecutor(AsyncioExecutor):
+    def __init__(self, loop=None, pool=db_pool):
+        super(OffloadingAsyncioExecutor, self).__init__(loop)
+        self.pool = pool
+        self.thread = None
+        self.context = None
+        # Última mutation do lote e as operações a partir dela
+        self.mutation = None
+        self.operations = []
+
+    def execute(self, fn, *args, **kwargs):
+        operation = root_field_of(args)
+        if operation == 'query':
+            return self.offload(fn, *args, **kwargs)
+        if operation == 'mutation':
+            return self.run_in_pool(self.request_context(), fn, args, kwargs)
+        return super(OffloadingAsyncioExecutor, self).execute(fn, *args, **kwargs)
+
+    def offload(self, fn, *args, **kwargs):
+        return self.run_in_pool(task_scope(), fn, args, kwargs)
+
+    def run_in_pool(self, context, fn, args, kwargs):
+        future = self.loop.run_in_executor(self.pool, run_in_session, context, fn, args, kwargs)
+        self.futures.append(future)
+        return Promise.resolve(future)
+
+    def request_context(self):
+        # Cópia do contexto da requisição (sessão da requisição): os campos
+        # podem ser resolvidos em callbacks de outras operações do lote
+        return self.context.run(contextvars.copy_context)
+
+    def in_order(self, mutation, fn, *args, **kwargs):
+        # Operações de um lote na ordem do lote: uma
+        # mutation começa depois que as operações anteriores terminarem (com
+        # sucesso ou não); as queries seguintes, depois que ela terminar.
+        # Queries consecutivas rodam juntas
+        if mutation:
+            waiting = self.operations
+        else:
+            waiting = [self.mutation] if self.mutation is not None else []
+        if not waiting:
+            result = Promise.resolve(fn(*args, **kwargs))
+        else:
+            context = self.request_context()
+            run = lambda _: context.run(fn, *args, **kwargs)
+            result = Promise.all(waiting).then(run, run)
+        if mutation:
+            self.mutation = result
+            self.operations = [result]
+        else:
+            self.operations.append(result)
+        return result
+
+    @contextlib.contextmanager
+    def activate(self):
+        # Os callbacks agendados no bloco herdam o contextvar, inclusive os
+        # que disparam os lotes dos loaders depois que o bloco termina
+        self.thread = threading.get_ident()
+        token = _current_executor.set(self)
+        self.context = contextvars.copy_context()
+        try:
+            yield self
+        finally:
+            _current_executor.reset(token)
+
+def run_batch(fn, *args):
+    # Função de lote de um DataLoader: no pool durante uma requisição ASGI;
+    # no Flask, na thread da requisição e na sessão dela
+    executor = _current_executor.get()
+    if executor is None:
+        return Promise.resolve(fn(*args))
+    return executor.offload(fn, *args)
+
+def call_on_loop(fn, *args):
+    # Para o que precisa rodar na thread do loop, como os DataLoaders
+    # (threading.local: cada thread vê seu próprio cache) usados pelas
+    # mutations, que no ASGI rodam no pool. A chamada é agendada antes de o
+    # resultado do campo chegar ao loop. Fora do pool, roda na hora
+    executor = _current_executor.get()
+    if executor is None or executor.thread == threading.get_ident():
+        return fn(*args)
+    executor.loop.call_soon_threadsafe(fn, *args)
+
+# Para o app Flask (GraphQLView(executor=...)): uma instância compartilhada,
+# com o estado de cada requisição na thread que a atende. No máximo
+# max_concurrency campos da mesma requisição ocupam o pool ao mesmo tempo;
+# os demais esperam na fila da requisição. As Promises são resolvidas na
+# thread da requisição, em wait_until_finished, na ordem em que os campos
+# terminam, então o resto da execução (completar valores, loaders) segue
+# nessa thread e na sessão dela. Só serve para return_promise=False.
+class PoolExecutor(object):
+    def __init__(self, pool=db_pool, max_concurrency=MAX_REQUEST_CONCURRENCY):
+        self.pool = pool
+        self.max_concurrency = max(1, max_concurrency)
+        self.local = threading.local()
+
+    def state(self):
+        if not hasattr(self.local, 'queued'):
+            self.local.queued = deque()
+            self.local.running = {}
+        return self.local
+
+    def execute(self, fn, *args, **kwargs):
+        if not offloadable(args):
+            return fn(*args, **kwargs)
+        promise = Promise()
+        state = self.state()
+        state.queued.append((promise, task_scope(), fn, args, kwargs))
+        self.submit(state)
+        return promise
+
+    def submit(self, state):
+        while state.queued and len(state.running) < self.max_concurrency:
+            promise, context, fn, args, kwargs = state.queued.popleft()
+            state.running[self.pool.submit(run_in_session, context, fn, args, kwargs)] = promise
+
+    def wait_until_finished(self):
+        state = self.state()
+        # Resolver uma Promise pode agendar mais campos, por isso o laço só
+        # termina com a fila e o pool vazios para esta requisição
+        while state.running:
+            done, _ = wait(list(state.running), return_when=FIRST_COMPLETED)
+            for future in done:
+                promise = state.running.pop(future)
+                self.submit(state)
+                error = future.exception()
+                if error is None:
+                    promise.do_resolve(future.result())
+                else:
+                    error.stack = error.__traceback__
+                    promise.do_reject(error, traceback=error.__traceback__)
+
+    def clean(self):
+        state = self.state()
+        for future in state.running:
+            future.cancel()
+        state.queued.clear()
+        state.running.clear()
@@ -0,0 +1,97 @@
+# fast_lists.py
+# Caminho rápido do executor padrão para listas de objetos "planos", como
+# `contracts { id description amount }`: quando todos os campos
+# selecionados são escalares nativos resolvidos por leitura de atributo, a
+# lista é completada em um laço direto, com getters pré-calculados, sem
+# passar por complete_value / resolve_field nem criar Promises por campo.
+#
+# O graphql-core 2 não tem ponto de extensão para a etapa de completar
+# valores, por isso install() substitui executor.complete_list_value. Tudo
+# que não se encaixa no caso simples (middleware, resolvers próprios,
+# objetos aninhados, valores inválidos) segue pela função original.
+from graphql.execution import executor
+from graphql.type import GraphQLNonNull, GraphQLObjectType, GraphQLScalarType
+
+from compiler import NATIVE_SCALARS, attribute_access
+
+NATIVE_TYPES = {'str': str, 'float': float, 'bool': bool}
+
+_complete_list_value = executor.complete_list_value
+
+def get_plan(exe_context, object_type, field_asts):
+    # Lista de (nome na resposta, atributo, padrão, tipo nativo, serialize, não nulo)
+    # ou None se algum campo exige o caminho completo
+    plan = []
+    subfields = exe_context.get_sub_fields(object_type, field_asts)
+    for response_name, subfield_asts in subfields.items():
+        field_name = subfield_asts[0].name.value
+        if field_name == '__typename':
+            plan.append((response_name, None, object_type.name, None, None, True))
+            continue
+        field_def = object_type.fields.get(field_name)
+        if field_def is None or any(subfield_ast.arguments for subfield_ast in subfield_asts):
+            return None
+        access = attribute_access(field_def.resolver)
+        if access is None:
+            return None
+        attname, default_value, _ = access
+
+        field_type = field_def.type
+        non_null = isinstance(field_type, GraphQLNonNull)
+        if non_null:
+            field_type = field_type.of_type
+        if not isinstance(field_type, GraphQLScalarType) or field_type.name not in ('ID', 'String', 'Int', 'Float', 'Boolean'):
+            return None
+        native = NATIVE_TYPES.get(NATIVE_SCALARS.get(field_type.name))
+        plan.append((response_name, attname, default_value, native, field_type.serialize, non_null))
+    return plan
+
+def complete_list_value(exe_context, return_type, field_asts, info, path, result):
+    item_type = return_type.of_type
+    item_non_null = isinstance(item_type, GraphQLNonNull)
+    if item_non_null:
+        item_type = item_type.of_type
+    if exe_context.middleware or not isinstance(item_type, GraphQLObjectType):
+        return _complete_list_value(exe_context, return_type, field_asts, info, path, result)
+
+    plan = get_plan(exe_context, item_type, field_asts)
+    if plan is None:
+        return _complete_list_value(exe_context, return_type, field_asts, info, path, result)
+
+    # O resultado pode ser um iterável de uso único: materializa uma vez só
+    items = result if isinstance(result, (list, tuple)) else list(result)
+    is_type_of = item_type.is_type_of
+    completed = []
+    append = completed.append
+    for item in items:
+        if item is None:
+            if item_non_null:
+                return _complete_list_value(exe_context, return_type, field_asts, info, path, items)
+            append(None)
+            continue
+        if is_type_of and not is_type_of(item, info):
+            return _complete_list_value(exe_context, return_type, field_asts, info, path, items)
+
+        row = {}
+        from_dict = isinstance(item, dict)
+        for response_name, attname, default_value, native, serialize, non_null in plan:
+            if attname is None:
+                row[response_name] = default_value
+                continue
+            value = item.get(attname, default_value) if from_dict else getattr(item, attname, default_value)
+            if value is None:
+                if non_null:
+                    return _complete_list_value(exe_context, return_type, field_asts, info, path, items)
+            elif type(value) is not native:
+                value = serialize(value)
+                if value is None:
+                    return _complete_list_value(exe_context, return_type, field_asts, info, path, items)
+            row[response_name] = value
+        append(row)
+    return completed
+
+def install():
+    executor.complete_list_value = complete_list_value
+
+def uninstall():
+    executor.complete_list_value = _complete_list_value
@@ -0,0 +1,149 @@
+# loaders.py
+from collections import defaultdict
+from promise.dataloader import DataLoader
+from sqlalchemy import func, inspect, tuple_
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from entity_cache import entity_cache
+from executors import call_on_loop, run_batch
+from models import User as UserModel
+from pagination import page_size, parse_after_id
+
+# Carrega usuários em lote: todos os ids pedidos durante uma execução
+# viram um único SELECT ... WHERE id IN (...), só com os que não estão no
+# cache de entidades. O SELECT roda em executors.run_batch (no ASGI, fora
+# do loop)
+class UserLoader(DataLoader):
+    def batch_load_fn(self, keys):
+        return run_batch(entity_cache.load_many, UserModel, keys)
+
+# Carrega um relacionamento de vários objetos pais com um único SELECT.
+# O get_batch_resolver do graphene-sqlalchemy 2.3 usa APIs internas do
+# SQLAlchemy 1.3 e não funciona com o 1.4, por isso a implementação própria.
+# Relacionamentos to-many (ex.: User.contracts) vêm em páginas por chave
+# primária, como os campos raiz: page é (tamanho, chave depois da qual
+# começar ou None), com o limite aplicado a cada pai no SQL
+def load_children(relationship, parents, page=None):
+    (local_column, remote_column), = relationship.local_remote_pairs
+    local_key = relationship.parent.get_property_by_column(local_column).key
+    remote_key = relationship.mapper.get_property_by_column(remote_column).key
+    child_model = relationship.mapper.class_
+    primary_key = relationship.mapper.primary_key
+
+    keys = set(getattr(parent, local_key) for parent in parents)
+    query = child_model.query.filter(remote_column.in_(keys))
+    if page is None:
+        query = query.order_by(*(relationship.order_by or primary_key))
+    else:
+        limit, after = page
+        if after is not None:
+            query = query.filter(tuple_(*primary_key) > tuple_(*after))
+        # Numera os filhos de cada pai pela chave e fica com os `limit` primeiros
+        position = func.row_number().over(partition_by=remote_column, order_by=primary_key)
+        ranked = query.add_columns(position.label('position')).subquery()
+        ranked_child = aliased(child_model, ranked)
+        query = query.session.query(ranked_child).filter(ranked.c.position <= limit)
+        query = query.order_by(*[
+            getattr(ranked_child, relationship.mapper.get_property_by_column(column).key)
+            for column in primary_key
+        ])
+
+    children_by_key = defaultdict(list)
+    for child in query:
+        children_by_key[getattr(child, remote_key)].append(child)
+
+    # Lado inverso many-to-one (ex.: Contract.user ao carregar User.contracts)
+    reverse_key = None
+    if relationship.uselist and relationship.back_populates:
+        reverse = relationship.mapper.relationships[relationship.back_populates]
+        if not reverse.uselist:
+            reverse_key = reverse.key
+
+    results = []
+    for parent in parents:
+        children = children_by_key.get(getattr(parent, local_key), [])
+        if relationship.uselist:
+            value = children
+        else:
+            value = children[0] if children else None
+            # Preenche o atributo para que acessos seguintes não disparem
+            # lazy load (uma página de um to-many não é a coleção inteira)
+            set_committed_value(parent, relationship.key, value)
+        if reverse_key:
+            for child in children:
+                set_committed_value(child, reverse_key, parent)
+        results.append(value)
+    return results
+
+def page_of(relationship, children, page):
+    # Página de uma coleção já carregada, na ordem da chave primária
+    limit, after = page
+    primary_key = relationship.mapper.primary_key_from_instance
+    children = sorted(children, key=lambda child: tuple(primary_key(child)))
+    if after is not None:
+        children = [child for child in children if tuple(primary_key(child)) > tuple(after)]
+    return children[:limit]
+
+class RelationshipLoader(DataLoader):
+    cache = False
+
+    def __init__(self, relationship, page=None):
+        super(RelationshipLoader, self).__init__()
+        self.relationship = relationship
+        self.page = page
+
+    def batch_load_fn(self, parents):
+        return run_batch(self.load_children, parents)
+
+    def load_children(self, parents):
+        return load_children(self.relationship, parents, self.page)
+
+def get_relationship_resolver(relationship, batching=True):
+    # Sem batching (SQL_BATCHING=0), uma consulta por pai
+    def resolve(root, info, first=None, after=None):
+        page = (page_size(first), parse_after_id(after)) if relationship.uselist else None
+        # Relacionamento já carregado (ex.: pelo lado inverso): sem SQL
+        loaded = inspect(root).dict
+        if relationship.key in loaded:
+            value = loaded[relationship.key]
+            return value if page is None else page_of(relationship, value, page)
+        if not batching:
+            return load_children(relationship, [root], page)[0]
+        return get_loaders(info.context).relationship(relationship, page).load(root)
+
+    return resolve
+
+# Conjunto de loaders de uma requisição (a memoização e os lotes valem só
+# para ela). No ASGI as requisições dividem a thread do loop: loaders
+# compartilhados misturariam pais de requisições diferentes no mesmo lote
+class Loaders(object):
+    def __init__(self):
+        self.user = UserLoader(get_cache_key=int)
+        self.relationships = {}
+
+    def relationship(self, relationship, page=None):
+        # Um loader por relacionamento e página pedida
+        key = (relationship, page)
+        loader = self.relationships.get(key)
+        if loader is None:
+            loader = self.relationships[key] = RelationshipLoader(relationship, page)
+        return loader
+
+    def forget_user(self, id, row=None):
+        # Descarta o usuário memoizado (com row, troca pelos dados novos) para
+        # as operações seguintes do lote. As mutations que chamam rodam no
+        # pool no ASGI, e o cache do DataLoader é o da thread do loop
+        call_on_loop(self.replace_user, id, row)
+
+    def replace_user(self, id, row=None):
+        self.user.clear(id)
+        if row is not None:
+            self.user.prime(id, row)
+
+def get_loaders(context):
+    # Sem contexto (ex.: schema.execute direto) não há onde guardar os loaders
+    if context is None:
+        return Loaders()
+    if 'loaders' not in context:
+        context['loaders'] = Loaders()
+    return context['loaders']
@@ -0,0 +1,10 @@
+from database import SCHEMA_VERSION, bootstrap_db
+
+# Cria/atualiza o database.db (tabelas e índices que faltam) sem apagar os
+# dados. Pode rodar no build/deploy; com DB_BOOTSTRAP=0 a aplicação não
+# confere mais a versão do schema ao iniciar
+if __name__ == "__main__":
+    if bootstrap_db():
+        print("Database schema updated to version %d." % SCHEMA_VERSION)
+    else:
+        print("Database schema is up to date (version %d)." % SCHEMA_VERSION)
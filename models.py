@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -11,6 +11,12 @@ class User(Base):
 
 class Contract(Base):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        # Contratos de um usuário em ordem de criação (getContractsByUser, deleteUser)
+        Index('ix_contracts_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        # Ordenação e filtros por data
+        Index('ix_contracts_created_at_id', 'created_at', 'id'),
+    )
     id = Column(Integer, primary_key=True)
     description = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,59 @@
+# pagination.py
+# Paginação por keyset: cada página continua a partir da última chave
+# vista (WHERE (a, b) > (?, ?) ORDER BY a, b LIMIT n), então o custo de uma
+# página não depende de quão longe o cliente já paginou.
+import base64
+import datetime
+import json
+from graphql import GraphQLError
+from sqlalchemy import tuple_
+from config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+def page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit < 1:
+        raise GraphQLError('Page size must be a positive number.')
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf8')).decode('ascii')
+
+def decode_cursor(token, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf8'))
+        if len(values) != len(columns):
+            raise ValueError(token)
+        return [
+            datetime.datetime.fromisoformat(value) if column.type.python_type is datetime.datetime else value
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError, UnicodeError):
+        raise GraphQLError('Invalid pagination token.')
+
+def parse_after_id(after):
+    # Cursor `after` dos campos paginados por id: o último id recebido
+    if not after:
+        return None
+    try:
+        return (int(after),)
+    except ValueError:
+        raise GraphQLError('Invalid pagination token.')
+
+def keyset_page(query, columns, limit, after=None):
+    # Retorna (linhas, há_mais_páginas), buscando uma linha além do limite
+    if after is not None:
+        query = query.filter(tuple_(*columns) > tuple_(*after))
+    rows = query.order_by(*columns).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def paginate(query, columns, limit=None, token=None):
+    # Retorna (linhas, próximo token ou None)
+    limit = page_size(limit)
+    after = decode_cursor(token, columns) if token else None
+    rows, has_more = keyset_page(query, columns, limit, after)
+    next_token = None
+    if has_more:
+        next_token = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_token
@@ -0,0 +1,80 @@
+# persisted_queries.py
+# Automatic persisted queries: o cliente envia só o sha256 da query em
+# extensions.persistedQuery.sha256Hash; a query completa só é enviada na
+# primeira vez (ou quando o servidor responde PersistedQueryNotFound).
+import hashlib
+import os
+import re
+import sys
+from collections import OrderedDict
+from threading import Lock
+
+from config import PERSISTED_QUERIES_DIR, PERSISTED_QUERIES_SIZE
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf8')).hexdigest()
+
+# Queries indexadas pelo hash: LRU em memória e, opcionalmente, um arquivo
+# por query em disco (que também serve de allow-list gerada no deploy)
+class PersistedQueryStore(object):
+    def __init__(self, directory=PERSISTED_QUERIES_DIR, max_size=PERSISTED_QUERIES_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.queries = OrderedDict()
+        self.lock = Lock()
+
+    def path(self, sha256):
+        return os.path.join(self.directory, sha256 + '.graphql')
+
+    def get(self, sha256):
+        if not SHA256_PATTERN.match(sha256 or ''):
+            return None
+        with self.lock:
+            query = self.queries.get(sha256)
+            if query is not None:
+                self.queries.move_to_end(sha256)
+                return query
+        if self.directory and os.path.exists(self.path(sha256)):
+            with open(self.path(sha256), encoding='utf8') as f:
+                query = f.read()
+            self.remember(sha256, query)
+        return query
+
+    def register(self, query, persist=False):
+        sha256 = query_hash(query)
+        self.remember(sha256, query)
+        if persist and self.directory and not os.path.exists(self.path(sha256)):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(sha256), 'w', encoding='utf8') as f:
+                f.write(query)
+        return sha256
+
+    def preload(self):
+        # Carrega as queries gravadas no diretório (ex.: no init do container)
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        queries = []
+        for filename in sorted(os.listdir(self.directory))[:self.max_size]:
+            sha256, extension = os.path.splitext(filename)
+            if extension == '.graphql' and SHA256_PATTERN.match(sha256):
+                queries.append(self.get(sha256))
+        return queries
+
+    def remember(self, sha256, query):
+        with self.lock:
+            self.queries[sha256] = query
+            self.queries.move_to_end(sha256)
+            while len(self.queries) > self.max_size:
+                self.queries.popitem(last=False)
+
+# Registra as queries dos arquivos informados no diretório configurado:
+#   PERSISTED_QUERIES_DIR=persisted python persisted_queries.py queries/*.graphql
+if __name__ == '__main__':
+    if not PERSISTED_QUERIES_DIR:
+        sys.exit('PERSISTED_QUERIES_DIR is not set.')
+    store = PersistedQueryStore()
+    for filename in sys.argv[1:]:
+        with open(filename, encoding='utf8') as f:
+            print(store.register(f.read(), persist=True), filename)
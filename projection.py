@@ -0,0 +1,42 @@
+# projection.py
+# Projeção do SQL a partir da seleção GraphQL: busca só as colunas que o
+# cliente pediu. As linhas voltam como Row (tuplas com atributos), que não
+# são hidratadas em entidades nem entram no identity map da sessão.
+import sqlalchemy
+from graphql.language import ast
+from database import db_session
+
+def collect_fields(selection_sets, fragments):
+    fields = []
+    for selection_set in selection_sets:
+        if selection_set is None:
+            continue
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                fields.append(selection)
+            elif isinstance(selection, ast.InlineFragment):
+                fields += collect_fields([selection.selection_set], fragments)
+            elif isinstance(selection, ast.FragmentSpread):
+                fields += collect_fields([fragments[selection.name.value].selection_set], fragments)
+    return fields
+
+def selected_fields(info, path=()):
+    # Nomes dos campos pedidos abaixo do campo atual; path desce por
+    # campos intermediários (ex.: ('Contracts',) em getContractsByUser)
+    fields = collect_fields([field_ast.selection_set for field_ast in info.field_asts], info.fragments)
+    for name in path:
+        selection_sets = [field.selection_set for field in fields if field.name.value == name]
+        fields = collect_fields(selection_sets, info.fragments)
+    return set(field.name.value for field in fields)
+
+def project(model, info, path=(), aliases=None, required=()):
+    # aliases mapeia campos GraphQL para atributos do modelo
+    # (ex.: {'contract_id': 'id', 'user': 'user_id'}); required lista
+    # atributos sempre necessários (chaves de paginação, por exemplo)
+    aliases = aliases or {}
+    names = set(aliases.get(name, name) for name in selected_fields(info, path))
+    names.update(required)
+    mapper = sqlalchemy.inspect(model)
+    names.update(column.key for column in mapper.primary_key)
+    columns = [getattr(model, prop.key) for prop in mapper.column_attrs if prop.key in names]
+    return db_session.query(*columns)
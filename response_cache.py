@@ -0,0 +1,186 @@
+# response_cache.py
+# Cache de respostas completas (JSON já codificado) de operações query. A
+# chave combina o hash do documento, as variáveis em forma canônica, o nome
+# da operação, o escopo de autenticação da requisição e a versão de cada
+# tabela que a operação lê. Commits que alteram users/contracts (qualquer
+# mutation, ver database.on_commit) incrementam a versão das tabelas
+# alteradas: as respostas antigas deixam de ser encontradas e saem por LRU
+# ou TTL.
+#
+# O armazenamento é plugável. MemoryBackend guarda tudo no processo; um
+# backend compartilhado (ex.: Redis, para vários processos ou containers)
+# implementa os mesmos métodos:
+#   get(key) -> bytes ou None
+#   set(key, value, ttl)
+#   versions(tables) -> lista de inteiros, na ordem de tables
+#   bump(tables)
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from graphene_sqlalchemy import SQLAlchemyObjectType
+from graphql.language import ast
+from graphql.type import GraphQLObjectType
+
+from config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from cost import OperationCost, unwrap
+from models import Contract as ContractModel, User as UserModel
+from persisted_queries import query_hash
+
+USERS = UserModel.__tablename__
+CONTRACTS = ContractModel.__tablename__
+ALL_TABLES = (CONTRACTS, USERS)
+
+# Tabelas lidas pelos tipos que não são SQLAlchemyObjectType (nestes o
+# model do tipo informa a tabela). Tipos desconhecidos dependem de todas
+TYPE_TABLES = {
+    'User': (USERS,),
+    'Contract': (CONTRACTS,),
+    'GetContract': (CONTRACTS,),
+    'ContractsResult': (CONTRACTS,),
+}
+
+def type_tables(graphql_type):
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+    if graphene_type is not None and issubclass(graphene_type, SQLAlchemyObjectType):
+        return (graphene_type._meta.model.__tablename__,)
+    return TYPE_TABLES.get(graphql_type.name, ALL_TABLES)
+
+def operation_tables(schema, document_ast, operation_name):
+    # Tabelas de que a resposta da operação depende, pelos tipos dos campos
+    # selecionados; None se a operação não existe ou não é query
+    fragments = {}
+    operation = None
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.FragmentDefinition):
+            fragments[definition.name.value] = definition
+        elif isinstance(definition, ast.OperationDefinition):
+            if operation_name is None or (definition.name and definition.name.value == operation_name):
+                operation = definition
+    if operation is None or operation.operation != 'query':
+        return None
+
+    walker = OperationCost(schema, operation, fragments)
+    tables = set()
+    pending = [(schema.get_query_type(), operation.selection_set)]
+    while pending:
+        parent_type, selection_set = pending.pop()
+        for field_ast in walker.collect_fields(selection_set, frozenset()):
+            name = field_ast.name.value
+            field_def = parent_type.fields.get(name)
+            if name.startswith('__') or field_def is None:
+                continue
+            named_type, _ = unwrap(field_def.type)
+            if isinstance(named_type, GraphQLObjectType) and field_ast.selection_set is not None:
+                if not named_type.name.startswith('__'):
+                    tables.update(type_tables(named_type))
+                pending.append((named_type, field_ast.selection_set))
+    return tuple(sorted(tables))
+
+def canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+# LRU em memória, limitado em número de respostas e em bytes, com TTL por
+# resposta. As versões das tabelas ficam fora do LRU: se fossem despejadas,
+# voltariam a 0 e respostas antigas seriam encontradas de novo
+class MemoryBackend(object):
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.table_versions = {}
+        self.size_bytes = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                self.discard(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.discard(key)
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.size_bytes += len(value)
+            while len(self.entries) > self.max_size or self.size_bytes > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+                self.evictions += 1
+
+    def discard(self, key):
+        value, _ = self.entries.pop(key)
+        self.size_bytes -= len(value)
+
+    def versions(self, tables):
+        with self.lock:
+            return [self.table_versions.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        with self.lock:
+            for table in tables:
+                self.table_versions[table] = self.table_versions.get(table, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'bytes': self.size_bytes, 'evictions': self.evictions}
+
+class ResponseCache(object):
+    def __init__(self, backend=None, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    def key(self, document, variables, operation_name, scope=None):
+        # Chave da resposta ou None se a operação não pode ir para o cache
+        tables = getattr(document, 'response_tables', None)
+        if tables is None:
+            tables = document.response_tables = {}
+        if operation_name not in tables:
+            tables[operation_name] = operation_tables(document.schema, document.document_ast, operation_name)
+        dependencies = tables[operation_name]
+        if dependencies is None:
+            return None
+        versions = self.backend.versions(dependencies)
+        return hashlib.sha256(canonical_json([
+            query_hash(document.document_string),
+            operation_name,
+            variables or {},
+            scope,
+            list(zip(dependencies, versions)),
+        ]).encode('utf8')).hexdigest()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, written):
+        # Listener de database.on_commit: {tabela: chaves alteradas}
+        self.backend.bump(sorted(written))
+
+    def stats(self):
+        with self.lock:
+            stats = {'hits': self.hits, 'misses': self.misses}
+        stats.update(getattr(self.backend, 'stats', dict)())
+        return stats
@@ -1,15 +1,42 @@
 import graphene
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from graphene_sqlalchemy import SQLAlchemyObjectType
 from models import User as UserModel, Contract as ContractModel
 from database import db_session
+from entity_cache import entity_cache
+from loaders import get_loaders, get_relationship_resolver
+from config import MAX_BULK_SIZE, SQL_BATCHING
+from pagination import paginate, page_size, keyset_page, parse_after_id
+from projection import project
+from graphql import GraphQLError
 import datetime
 
+# Tipo base: relacionamentos carregados em lote por padrão (ver SQL_BATCHING).
+# Relacionamentos to-many são sempre paginados (first/after), também sem
+# batching
+class BatchedObjectType(SQLAlchemyObjectType):
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def __init_subclass_with_meta__(cls, batching=SQL_BATCHING, **options):
+        super(BatchedObjectType, cls).__init_subclass_with_meta__(**options)
+        for relationship in sqlalchemy.inspect(cls._meta.model).relationships:
+            resolver_name = 'resolve_' + relationship.key
+            if (batching or relationship.uselist) and not hasattr(cls, resolver_name):
+                setattr(cls, resolver_name, get_relationship_resolver(relationship, batching))
+
 # Definindo tipos GraphQL baseados nos modelos SQLAlchemy
-class UserType(SQLAlchemyObjectType):
+class UserType(BatchedObjectType):
     class Meta:
         model = UserModel
 
-class ContractType(SQLAlchemyObjectType):
+    # Contratos do usuário em páginas por id, como o campo raiz contracts
+    contracts = graphene.List(lambda: ContractType, first=graphene.Int(), after=graphene.ID())
+
+class ContractType(BatchedObjectType):
     class Meta:
         model = ContractModel
 
@@ -61,6 +88,109 @@ class CreateUser(graphene.Mutation):
             error=None
         )
 
+def user_ids_by_email(emails, chunk_size=500):
+    # {email: id} dos usuários com os emails informados, em consultas IN
+    emails = sorted(emails)
+    ids = {}
+    for start in range(0, len(emails), chunk_size):
+        chunk = emails[start:start + chunk_size]
+        ids.update((email, id) for id, email in db_session.query(UserModel.id, UserModel.email).filter(UserModel.email.in_(chunk)))
+    return ids
+
+class UpsertedUser(graphene.ObjectType):
+    id = graphene.ID()
+    name = graphene.String()
+    email = graphene.String()
+    created = graphene.Boolean()
+
+def insert_new_users(rows):
+    # Insere os usuários cujo email ainda não existe, contando com a
+    # constraint de unicidade do email. Retorna ({email: id} de todos os
+    # emails de rows, ids dos usuários criados)
+    table = UserModel.__table__
+    emails = set(row['email'] for row in rows)
+    dialect = db_session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        result = db_session.execute(
+            postgresql_insert(table).on_conflict_do_nothing(index_elements=['email']).returning(table.c.id), rows)
+        created = set(id for (id,) in result)
+        return user_ids_by_email(emails), created
+    if dialect == 'sqlite':
+        # Sem RETURNING no SQLAlchemy 1.4: o INSERT pegou o lock de escrita
+        # do SQLite, então os usuários criados nesta transação têm os
+        # rowcount maiores ids da tabela
+        inserted = db_session.execute(
+            sqlite_insert(table).on_conflict_do_nothing(index_elements=['email']), rows).rowcount
+        last_id = db_session.execute(sqlalchemy.select(sqlalchemy.func.max(table.c.id))).scalar()
+        ids = user_ids_by_email(emails)
+        return ids, set(id for id in ids.values() if id > last_id - inserted)
+
+    # Outros bancos, sem ON CONFLICT: consulta os emails existentes e insere
+    # os demais (um concorrente que insira o mesmo email antes do commit faz
+    # a constraint falhar e a mutação inteira é desfeita)
+    existing = user_ids_by_email(emails)
+    new_rows = []
+    for row in rows:
+        if row['email'] not in existing:
+            existing[row['email']] = None
+            new_rows.append(row)
+    if new_rows:
+        db_session.execute(table.insert(), new_rows)
+    ids = user_ids_by_email(emails)
+    return ids, set(ids[row['email']] for row in new_rows)
+
+# Mutação para criação/atualização de usuários em lote, sem consultar antes
+# se o email existe: a unicidade fica com a constraint do banco. Em uma
+# transação, um INSERT ... ON CONFLICT (email) DO NOTHING (executemany) cria
+# os usuários novos (SQLite e PostgreSQL; nos demais bancos, ver
+# insert_new_users) e um UPDATE (executemany) atualiza o nome dos
+# existentes. users segue a ordem da entrada
+class UpsertUsers(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(CreateUserInput), required=True)
+
+    users = graphene.List(UpsertedUser)
+    created = graphene.Int()
+    existing = graphene.Int()
+
+    def mutate(self, info, input):
+        if len(input) > MAX_BULK_SIZE:
+            raise GraphQLError('At most {} users can be upserted at once.'.format(MAX_BULK_SIZE))
+        if not input:
+            return UpsertUsers(users=[], created=0, existing=0)
+
+        rows = [{'name': item.name, 'email': item.email} for item in input]
+        table = UserModel.__table__
+        ids, created_ids = insert_new_users(rows)
+        inserted = len(created_ids)
+
+        users = []
+        updates = []
+        seen = set()
+        for row in rows:
+            id = ids[row['email']]
+            created = id in created_ids and row['email'] not in seen
+            seen.add(row['email'])
+            if not created:
+                updates.append({'match_email': row['email'], 'name': row['name']})
+            users.append(UpsertedUser(id=id, name=row['name'], email=row['email'], created=created))
+        if updates:
+            db_session.execute(
+                table.update()
+                .where(table.c.email == sqlalchemy.bindparam('match_email'))
+                .values(name=sqlalchemy.bindparam('name')),
+                updates
+            )
+        db_session.commit()
+
+        # Em um lote, as operações seguintes devem ver os nomes atualizados
+        loaders = get_loaders(info.context)
+        for user in users:
+            if not user.created:
+                loaders.forget_user(user.id)
+
+        return UpsertUsers(users=users, created=inserted, existing=len(rows) - inserted)
+
 # Input para a mutação de atualização de usuário
 class UpdateUserInput(graphene.InputObjectType):
     name = graphene.String()
@@ -101,6 +231,9 @@ class UpdateUser(graphene.Mutation):
             user.email = input.email
         
         db_session.commit()
+
+        # Em um lote, as operações seguintes devem ver os dados novos
+        get_loaders(info.context).forget_user(user.id, entity_cache.row(UserModel, user))
         
         return UpdateUser(
             id=user.id,
@@ -118,22 +251,56 @@ class DeleteUser(graphene.Mutation):
     message = graphene.String()
 
     def mutate(self, info, id):
-        # Verifica se o usuário existe
-        user = UserModel.query.get(id)
-        if not user:
+        deleted, _ = delete_users([int(id)]) if id.isdigit() else (set(), 0)
+        if not deleted:
             return DeleteUser(success=False, message="User not found.")
+        # Em um lote, as operações seguintes não devem ver o usuário excluído
+        get_loaders(info.context).forget_user(int(id))
 
-        # Exclui os contratos associados ao usuário
-        contracts = ContractModel.query.filter_by(user_id=id).all()
-        for contract in contracts:
-            db_session.delete(contract)
-
-        # Exclui o usuário
-        db_session.delete(user)
-        db_session.commit()
-        
         return DeleteUser(success=True, message="User and associated contracts deleted successfully.")
 
+def delete_users(user_ids, chunk_size=500):
+    # Exclusão em conjunto: DELETEs por user_id/id em blocos de chunk_size
+    # ids, sem carregar contratos nem usuários na sessão, em uma transação.
+    # Só os ids de usuários existentes são usados; sem nenhum, nada é
+    # escrito. Retorna (ids excluídos, número de contratos excluídos)
+    existing = existing_user_ids(set(user_ids), chunk_size)
+    if not existing:
+        return existing, 0
+    user_ids = sorted(existing)
+    contracts_table = ContractModel.__table__
+    users_table = UserModel.__table__
+    contracts = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        contracts += db_session.execute(
+            contracts_table.delete().where(contracts_table.c.user_id.in_(chunk))).rowcount
+        db_session.execute(users_table.delete().where(users_table.c.id.in_(chunk)))
+    db_session.commit()
+    return existing, contracts
+
+# Mutação para exclusão de usuários em lote (com os contratos de cada um)
+class DeleteUsers(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    deleted = graphene.List(graphene.ID)
+    not_found = graphene.List(graphene.ID)
+    contracts_deleted = graphene.Int()
+
+    def mutate(self, info, ids):
+        if len(ids) > MAX_BULK_SIZE:
+            raise GraphQLError('At most {} users can be deleted at once.'.format(MAX_BULK_SIZE))
+        user_ids = set(int(id) for id in ids if id.isdigit())
+        existing, contracts_deleted = delete_users(user_ids)
+
+        loaders = get_loaders(info.context)
+        for user_id in existing:
+            loaders.forget_user(user_id)
+        deleted = [id for id in ids if id.isdigit() and int(id) in existing]
+        not_found = [id for id in ids if not (id.isdigit() and int(id) in existing)]
+        return DeleteUsers(deleted=deleted, not_found=not_found, contracts_deleted=contracts_deleted)
+
 # Input para a mutação de criação de contrato
 class CreateContractInput(graphene.InputObjectType):
     description = graphene.String(required=True)
@@ -178,6 +345,105 @@ class CreateContract(graphene.Mutation):
             amount=contract.amount
         )
 
+# Erro de um item de uma mutação em lote (index: posição na lista de entrada)
+class BulkItemError(graphene.ObjectType):
+    index = graphene.Int()
+    message = graphene.String()
+
+def parse_contract_dates(values):
+    # Converte as datas do lote de uma vez: valores repetidos (comuns em
+    # importações) são convertidos uma única vez e o formato exato
+    # YYYY-MM-DDTHH:MM:SS usa fromisoformat, bem mais rápido que strptime.
+    # Datas inválidas viram None
+    parsed = {}
+    for value in set(values):
+        try:
+            if len(value) == 19 and value[10] == 'T':
+                parsed[value] = datetime.datetime.fromisoformat(value)
+            else:
+                parsed[value] = datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            parsed[value] = None
+    return [parsed[value] for value in values]
+
+def existing_user_ids(user_ids, chunk_size=500):
+    # Ids de usuário que existem, em consultas IN de até chunk_size ids
+    user_ids = sorted(user_ids)
+    existing = set()
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        existing.update(id for (id,) in db_session.query(UserModel.id).filter(UserModel.id.in_(chunk)))
+    return existing
+
+def insert_returning_ids(table, rows):
+    # Insere rows (executemany quando possível) e retorna os ids gerados,
+    # na ordem de rows
+    dialect = db_session.get_bind().dialect
+    if dialect.insert_executemany_returning:
+        return [id for (id,) in db_session.execute(table.insert().returning(table.c.id), rows)]
+    if dialect.name == 'sqlite':
+        # Sem RETURNING no SQLAlchemy 1.4. O INSERT pegou o lock de escrita
+        # do SQLite, que só é liberado no commit, e o rowid de cada linha
+        # nova é o maior da tabela + 1: os ids são consecutivos e terminam
+        # no maior id da tabela
+        db_session.execute(table.insert(), rows)
+        last_id = db_session.execute(sqlalchemy.select(sqlalchemy.func.max(table.c.id))).scalar()
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    # Demais bancos: um INSERT por linha, com a chave gerada de cada um
+    return [db_session.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+# Mutação para criação de contratos em lote: todos os itens são validados
+# antes da escrita e os válidos são inseridos de uma vez (ver
+# insert_returning_ids), em uma transação. ids e errors seguem a ordem da
+# entrada (id nulo para os itens com erro, que não são inseridos)
+class CreateContracts(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(graphene.NonNull(CreateContractInput), required=True)
+
+    ids = graphene.List(graphene.ID)
+    errors = graphene.List(BulkItemError)
+    created = graphene.Int()
+
+    def mutate(self, info, input):
+        if len(input) > MAX_BULK_SIZE:
+            raise GraphQLError('At most {} contracts can be created at once.'.format(MAX_BULK_SIZE))
+
+        dates = parse_contract_dates([item.created_at for item in input])
+        user_ids = []
+        for item in input:
+            try:
+                user_ids.append(int(item.user_id))
+            except ValueError:
+                user_ids.append(None)
+        users = existing_user_ids(set(user_id for user_id in user_ids if user_id is not None))
+
+        rows = []
+        positions = []
+        errors = []
+        for index, item in enumerate(input):
+            if dates[index] is None:
+                errors.append(BulkItemError(index=index, message='Invalid date: {}. Expected format YYYY-MM-DDTHH:MM:SS.'.format(item.created_at)))
+            elif user_ids[index] not in users:
+                errors.append(BulkItemError(index=index, message='User not found.'))
+            else:
+                positions.append(index)
+                rows.append({
+                    'description': item.description,
+                    'user_id': user_ids[index],
+                    'created_at': dates[index],
+                    'fidelity': item.fidelity,
+                    'amount': item.amount,
+                })
+
+        ids = [None] * len(input)
+        if rows:
+            inserted_ids = insert_returning_ids(ContractModel.__table__, rows)
+            db_session.commit()
+            for index, id in zip(positions, inserted_ids):
+                ids[index] = id
+
+        return CreateContracts(ids=ids, errors=errors, created=len(rows))
+
 # Input para a mutação de atualização de contrato
 class UpdateContractInput(graphene.InputObjectType):
     description = graphene.String()
@@ -252,6 +518,36 @@ class ContractsResult(graphene.ObjectType):
     Contracts = graphene.List(Contract)
     nextToken = graphene.String()
 
+# Filtros da consulta de contratos, aplicados diretamente no WHERE do SQL
+class ContractsFilterInput(graphene.InputObjectType):
+    user_id = graphene.ID()
+    created_after = graphene.String()
+    created_before = graphene.String()
+    min_amount = graphene.Float()
+    max_amount = graphene.Float()
+    fidelity = graphene.Int()
+
+def parse_filter_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        raise GraphQLError('Invalid date: {}. Expected format YYYY-MM-DDTHH:MM:SS.'.format(value))
+
+def filter_contracts(query, filter):
+    if filter.user_id is not None:
+        query = query.filter(ContractModel.user_id == filter.user_id)
+    if filter.created_after is not None:
+        query = query.filter(ContractModel.created_at >= parse_filter_date(filter.created_after))
+    if filter.created_before is not None:
+        query = query.filter(ContractModel.created_at < parse_filter_date(filter.created_before))
+    if filter.min_amount is not None:
+        query = query.filter(ContractModel.amount >= filter.min_amount)
+    if filter.max_amount is not None:
+        query = query.filter(ContractModel.amount <= filter.max_amount)
+    if filter.fidelity is not None:
+        query = query.filter(ContractModel.fidelity == filter.fidelity)
+    return query
+
 class GetContract(graphene.ObjectType):
     contract_id = graphene.ID()
     description = graphene.String()
@@ -262,57 +558,103 @@ class GetContract(graphene.ObjectType):
     user = graphene.Field(User)
 
     def resolve_user(parent, info):
-        return UserModel.query.get(parent.user_id)
+        # Agrupa os donos de todos os contratos da requisição em uma só consulta
+        return get_loaders(info.context).user.load(parent.user_id)
 
 # Definindo consultas GraphQL
 class Query(graphene.ObjectType):
-    users = graphene.List(User)
+    users = graphene.List(UserType, first=graphene.Int(), after=graphene.ID())
     user = graphene.Field(User, id=graphene.ID(required=True))
-    contracts = graphene.List(Contract)
+    contracts = graphene.List(
+        Contract,
+        first=graphene.Int(),
+        after=graphene.ID(),
+        filter=ContractsFilterInput()
+    )
     contract = graphene.Field(Contract, id=graphene.ID(required=True))
     getContract = graphene.Field(GetContract, id=graphene.ID(required=True))
-    getContractsByUser = graphene.Field(ContractsResult, user_id=graphene.ID(required=True))
+    getContractsByUser = graphene.Field(
+        ContractsResult,
+        user_id=graphene.ID(required=True),
+        limit=graphene.Int(),
+        nextToken=graphene.String()
+    )
     getUser = graphene.Field(User, id=graphene.ID(required=True))
 
-    def resolve_users(self, info):
-        return UserModel.query.all()
+    def resolve_users(self, info, first=None, after=None):
+        # Página por keyset em id: o cliente passa o último id recebido em `after`
+        users, _ = keyset_page(
+            UserModel.query,
+            (UserModel.id,),
+            page_size(first),
+            parse_after_id(after)
+        )
+        return users
 
     def resolve_user(self, info, id):
-        return UserModel.query.get(id)
-
-    def resolve_contracts(self, info):
-        return ContractModel.query.all()
+        return entity_cache.load(UserModel, id)
+
+    def resolve_contracts(self, info, first=None, after=None, filter=None):
+        query = project(ContractModel, info)
+        if filter:
+            query = filter_contracts(query, filter)
+        contracts, _ = keyset_page(
+            query,
+            (ContractModel.id,),
+            page_size(first),
+            parse_after_id(after)
+        )
+        return contracts
 
     def resolve_contract(self, info, id):
-        return ContractModel.query.get(id)
+        return project(ContractModel, info).filter(ContractModel.id == id).first()
 
     def resolve_getContract(self, info, id):
-        contract = ContractModel.query.get(id)
+        # Com o cache de entidades, a linha inteira (do cache ou carregada
+        # para ele); sem, só as colunas pedidas, e user_id só quando o
+        # usuário é pedido
+        if entity_cache.enabled:
+            contract = entity_cache.load(ContractModel, id)
+        else:
+            contract = project(
+                ContractModel, info, aliases={'contract_id': 'id', 'user': 'user_id'}
+            ).filter(ContractModel.id == id).first()
         if contract:
+            created_at = getattr(contract, 'created_at', None)
             return GetContract(
                 contract_id=contract.id,
-                description=contract.description,
-                user_id=contract.user_id,
-                created_at=contract.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                fidelity=contract.fidelity,
-                amount=contract.amount
+                description=getattr(contract, 'description', None),
+                user_id=getattr(contract, 'user_id', None),
+                created_at=created_at.strftime("%Y-%m-%d %H:%M:%S") if created_at else None,
+                fidelity=getattr(contract, 'fidelity', None),
+                amount=getattr(contract, 'amount', None)
             )
         return None
 
-    def resolve_getContractsByUser(self, info, user_id):
-        Contracts = ContractModel.query.filter_by(user_id=user_id).all()
-        nextToken = None  # Implementação da lógica de paginação, se necessário
+    def resolve_getContractsByUser(self, info, user_id, limit=None, nextToken=None):
+        # Paginação por keyset em (created_at, id); nextToken é opaco para o cliente
+        Contracts, nextToken = paginate(
+            project(ContractModel, info, ('Contracts',), required=('created_at',)).filter(
+                ContractModel.user_id == user_id
+            ),
+            (ContractModel.created_at, ContractModel.id),
+            limit,
+            nextToken
+        )
         return ContractsResult(Contracts=Contracts, nextToken=nextToken)
     
     def resolve_getUser(self, info, id):
-        return UserModel.query.get(id)
+        return entity_cache.load(UserModel, id)
 
 # Definindo mutações GraphQL
 class Mutation(graphene.ObjectType):
     createUser = CreateUser.Field()
     updateUser = UpdateUser.Field()
     deleteUser = DeleteUser.Field()
+    deleteUsers = DeleteUsers.Field()
+    upsertUsers = UpsertUsers.Field()
     createContract = CreateContract.Field()
+    createContracts = CreateContracts.Field()
     updateContract = UpdateContract.Field()
     deleteContract = DeleteContract.Field()
 
@@ -0,0 +1,118 @@
+# sessions.py
+# Ciclo de vida da sessão por requisição. A scoped_session só abre a sessão
+# (e pega uma conexão do pool) no primeiro acesso ao banco; no fim do app
+# context a sessão é desfeita se a requisição falhou e removida, o que
+# devolve as conexões ao pool e descarta o identity map.
+#
+# Métricas por requisição: objetos que entraram no identity map e tempo
+# total em que as conexões ficaram fora do pool. O identity map guarda
+# referências fracas, então o tamanho dele no fim da requisição só conta os
+# objetos ainda referenciados: os objetos são contados quando entram.
+# As sessões de tarefa (campos raiz resolvidos no pool de threads, ver
+# database.task_scope) contam para a requisição que as criou.
+import contextvars
+import logging
+import time
+from threading import Lock
+
+from sqlalchemy import event
+
+from database import RoutingSession, db_session, engine, read_engine, remove_sessions
+
+logger = logging.getLogger(__name__)
+
+# Contadores da requisição atual. O contextvar é copiado para os contextos
+# das sessões de tarefa, então as threads do pool somam nos mesmos contadores
+_request_counters = contextvars.ContextVar('request_counters', default=None)
+
+class RequestCounters(object):
+    def __init__(self):
+        self.hold_seconds = 0.0
+        self.identity_map_size = 0
+        self.lock = Lock()
+
+    def add(self, hold_seconds=0.0, identity_map_size=0):
+        with self.lock:
+            self.hold_seconds += hold_seconds
+            self.identity_map_size += identity_map_size
+
+def count(**values):
+    counters = _request_counters.get()
+    if counters is not None:
+        counters.add(**values)
+
+class SessionMetrics(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.identity_map_total = 0
+        self.identity_map_max = 0
+        self.hold_seconds_total = 0.0
+        self.hold_seconds_max = 0.0
+        self.lock = Lock()
+
+    def record(self, identity_map_size, hold_seconds, error=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.identity_map_total += identity_map_size
+            self.identity_map_max = max(self.identity_map_max, identity_map_size)
+            self.hold_seconds_total += hold_seconds
+            self.hold_seconds_max = max(self.hold_seconds_max, hold_seconds)
+
+    def stats(self):
+        with self.lock:
+            requests = self.requests or 1
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'identity_map_avg': self.identity_map_total / float(requests),
+                'identity_map_max': self.identity_map_max,
+                'connection_hold_ms_avg': self.hold_seconds_total * 1000 / requests,
+                'connection_hold_ms_max': self.hold_seconds_max * 1000,
+            }
+
+metrics = SessionMetrics()
+
+def on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info['checked_out_at'] = time.perf_counter()
+
+def on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop('checked_out_at', None) if connection_record is not None else None
+    if started is not None:
+        count(hold_seconds=time.perf_counter() - started)
+
+def on_persistent(session, instance):
+    count(identity_map_size=1)
+
+def reset_request_metrics():
+    _request_counters.set(RequestCounters())
+
+def remove_session(exception=None):
+    # Sem acesso ao banco na requisição, não há sessão a remover
+    if not db_session.registry.has():
+        reset_request_metrics()
+        return
+    session = db_session()
+    try:
+        if exception is not None:
+            session.rollback()
+            session.expunge_all()
+    finally:
+        remove_sessions()
+    counters = _request_counters.get() or RequestCounters()
+    reset_request_metrics()
+    hold_seconds, identity_map_size = counters.hold_seconds, counters.identity_map_size
+    metrics.record(identity_map_size, hold_seconds, exception is not None)
+    logger.debug('Session removed: identity_map=%d connection_hold=%.2fms',
+                 identity_map_size, hold_seconds * 1000)
+
+def init_app(app):
+    for bound in set([engine, read_engine]):
+        event.listen(bound, 'checkout', on_checkout)
+        event.listen(bound, 'checkin', on_checkin)
+    # Objetos lidos do banco e objetos novos gravados no flush
+    event.listen(RoutingSession, 'loaded_as_persistent', on_persistent)
+    event.listen(RoutingSession, 'pending_to_persistent', on_persistent)
+    app.before_request(reset_request_metrics)
+    app.teardown_appcontext(remove_session)
@@ -0,0 +1,151 @@
+# view.py
+import json
+
+from flask import Response, request
+from flask_graphql import GraphQLView as BaseGraphQLView
+from graphql import get_default_backend
+from graphql_server import HttpQueryError, get_graphql_params
+
+from backend import RequestBackend
+from config import (
+    GRAPHQL_BATCH,
+    JSON_ENCODER,
+    JSON_STREAM_CHUNK,
+    JSON_STREAM_THRESHOLD,
+    MAX_BATCH_SIZE,
+    PERSISTED_QUERIES_ONLY,
+)
+from encoding import ResponseEncoder
+from loaders import Loaders
+from persisted_queries import query_hash
+
+class GraphQLView(BaseGraphQLView):
+    persisted_queries = None
+    response_cache = None
+    persisted_queries_only = PERSISTED_QUERIES_ONLY
+    batch = GRAPHQL_BATCH
+    max_batch_size = MAX_BATCH_SIZE
+    encoder = staticmethod(ResponseEncoder(JSON_ENCODER, JSON_STREAM_THRESHOLD, JSON_STREAM_CHUNK))
+    # Estado da requisição (o Flask cria uma instância da view por requisição)
+    body = None
+    request_backend = None
+    cacheable = False
+
+    def get_context(self):
+        # Contexto novo a cada requisição, com seus próprios loaders; em um
+        # lote todas as operações compartilham o mesmo contexto (e a sessão)
+        return {'request': request, 'loaders': Loaders()}
+
+    def get_cache_scope(self):
+        # Respostas em cache só são reaproveitadas para a mesma credencial
+        return request.headers.get('Authorization')
+
+    def get_cache_key(self):
+        # Chave no cache de respostas; None se a requisição não pode usá-lo
+        # (lote, mutation, query inválida, resposta formatada ou GraphiQL)
+        if self.response_cache is None or self.pretty or request.args.get('pretty'):
+            return None
+        if request.method == 'GET' and self.should_display_graphiql():
+            return None
+        try:
+            data = self.parse_body()
+        except HttpQueryError:
+            # O dispatch_request do flask-graphql responde com o erro
+            return None
+        if not hasattr(data, 'get'):
+            return None
+        params = get_graphql_params(data, request.args)
+        if not params.query:
+            return None
+        try:
+            document = self.get_backend().document_from_string(self.schema, params.query)
+        except Exception:
+            return None
+        return self.response_cache.key(
+            document, params.variables, params.operation_name, self.get_cache_scope())
+
+    def get_backend(self):
+        # O documento obtido por get_cache_key é reaproveitado na execução
+        if self.request_backend is None:
+            backend = super(GraphQLView, self).get_backend() or get_default_backend()
+            self.request_backend = RequestBackend(backend)
+        return self.request_backend
+
+    def encode(self, data, pretty=False):
+        # Só respostas sem erros vão para o cache
+        self.cacheable = isinstance(data, dict) and 'errors' not in data
+        return self.encoder(data, pretty)
+
+    def dispatch_request(self):
+        cache_key = self.get_cache_key()
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached, status=200, content_type='application/json')
+
+        response = super(GraphQLView, self).dispatch_request()
+
+        # As respostas transmitidas em pedaços (listas longas) não são guardadas
+        if (cache_key is not None and self.cacheable and response.status_code == 200
+                and not response.is_streamed):
+            self.response_cache.set(cache_key, response.get_data())
+        return response
+
+    def parse_body(self):
+        # Lido uma vez por requisição: get_cache_key e o dispatch_request do
+        # flask-graphql recebem o mesmo corpo
+        if self.body is None:
+            self.body = self.read_body()
+        return self.body
+
+    def read_body(self):
+        data = super(GraphQLView, self).parse_body()
+        if isinstance(data, list) and self.batch and len(data) > self.max_batch_size:
+            raise HttpQueryError(
+                413, 'Batch size exceeds the limit of {} operations.'.format(self.max_batch_size))
+        if self.persisted_queries is None:
+            return data
+        if isinstance(data, list):
+            return [self.resolve_persisted_query(entry) for entry in data]
+        # Em GET os parâmetros vêm na query string
+        if not data and 'extensions' in request.args:
+            data = request.args
+        return self.resolve_persisted_query(data)
+
+    def resolve_persisted_query(self, data):
+        if not hasattr(data, 'get'):
+            return data
+
+        extensions = data.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, 'Extensions are invalid JSON.')
+        persisted_query = extensions.get('persistedQuery') if isinstance(extensions, dict) else None
+
+        if not persisted_query:
+            if self.persisted_queries_only:
+                raise HttpQueryError(403, 'Only persisted queries are allowed.')
+            return data
+
+        sha256 = persisted_query.get('sha256Hash') if isinstance(persisted_query, dict) else None
+        if not isinstance(sha256, str):
+            raise HttpQueryError(400, 'Invalid persistedQuery extension: sha256Hash is required.')
+        query = data.get('query')
+        if query:
+            if query_hash(query) != sha256:
+                raise HttpQueryError(400, 'Provided sha256Hash does not match query.')
+            if self.persisted_queries.get(sha256) is None:
+                # No modo allow-list os clientes não podem registrar queries novas
+                if self.persisted_queries_only:
+                    raise HttpQueryError(403, 'Only persisted queries are allowed.')
+                self.persisted_queries.register(query)
+            return data
+
+        query = self.persisted_queries.get(sha256)
+        if query is None:
+            raise HttpQueryError(400, 'PersistedQueryNotFound')
+        data = data.to_dict() if hasattr(data, 'to_dict') else dict(data)
+        data['query'] = query
+        return data
@@ -1,6 +1,14 @@
-from app import app
+# wsgi.py
+# Handler do Lambda. O que roda no carregamento do módulo é feito uma vez
+# por container (fase de init); o handler só atende a requisição.
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import app, warm_up
+
+# Uma única vez: aplicado dentro do handler, cada invocação empilhava mais
+# um ProxyFix sobre os anteriores
+app.wsgi_app = ProxyFix(app.wsgi_app)
+warm_up()
 
 def handler(event, context):
-    from werkzeug.middleware.proxy_fix import ProxyFix
-    app.wsgi_app = ProxyFix(app.wsgi_app)
     return app(event, context)